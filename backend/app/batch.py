@@ -0,0 +1,310 @@
+# backend/app/batch.py
+import json
+import os
+import shutil
+import tempfile
+import time
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, wait
+from app.cache import ResultCache
+from app.com import SUPPORTED_EXTENSIONS, handle_file
+from app.jobs import JobProgress
+from app.metrics import stage
+from app.pool import PoolFull
+
+# Relative cost per byte of each file type, used to start the most
+# expensive files first so one large scan does not finish the batch alone
+TYPE_COST = {
+    ".png": 8, ".jpg": 8, ".jpeg": 8,
+    ".pdf": 4,
+    ".doc": 2, ".docx": 2, ".pptx": 2,
+    ".txt": 1, ".csv": 1, ".xlsx": 1,
+}
+
+MAX_ARCHIVE_BYTES = int(float(os.environ.get("REDACT_BATCH_MAX_MB", 2048)) * 2**20)
+MAX_ARCHIVE_FILES = int(os.environ.get("REDACT_BATCH_MAX_FILES", 10000))
+# Seconds a whole batch job may take; files still queued or running then fail
+BATCH_TIMEOUT = float(os.environ.get("REDACT_BATCH_TIMEOUT", 3600))
+
+
+def collect(root):
+    """(relative path, absolute path) of every file under ``root``."""
+    inputs = []
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames.sort()
+        for name in sorted(filenames):
+            path = os.path.join(dirpath, name)
+            inputs.append((os.path.relpath(path, root).replace(os.sep, "/"), path))
+    return inputs
+
+
+def schedule(inputs):
+    """Order inputs most expensive first (size weighted by file type)."""
+    def cost(item):
+        _, path = item
+        ext = os.path.splitext(path)[-1].lower()
+        return os.path.getsize(path) * TYPE_COST.get(ext, 1)
+    return sorted(inputs, key=cost, reverse=True)
+
+
+def extract_zip(zip_path, dest_dir):
+    """Unpack an uploaded archive, refusing paths that escape ``dest_dir``
+    and archives over ``MAX_ARCHIVE_BYTES`` / ``MAX_ARCHIVE_FILES``."""
+    dest_dir = os.path.abspath(dest_dir)
+    with zipfile.ZipFile(zip_path) as archive:
+        members = [info for info in archive.infolist() if not info.is_dir()]
+        if len(members) > MAX_ARCHIVE_FILES:
+            raise ValueError(f"Archive has more than {MAX_ARCHIVE_FILES} files")
+        if sum(info.file_size for info in members) > MAX_ARCHIVE_BYTES:
+            raise ValueError("Archive is too large once extracted")
+        for info in members:
+            target = os.path.abspath(os.path.join(dest_dir, info.filename))
+            if not target.startswith(dest_dir + os.sep):
+                raise ValueError(f"Unsafe path in archive: {info.filename}")
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            with archive.open(info) as src, open(target, "wb") as out:
+                shutil.copyfileobj(src, out)
+
+
+def redact_one(src, dest_dir, redaction_type, redaction_level):
+    """Worker entry point: redact ``src`` into ``dest_dir`` (through the
+    result cache) and return the output path. The input is left untouched."""
+    cache = ResultCache.default()
+    key = ResultCache.key(ResultCache.file_digest(src), src, redaction_type, redaction_level)
+    os.makedirs(dest_dir, exist_ok=True)
+
+    cached_path = cache.get(key)
+    if cached_path:
+        dest = os.path.join(dest_dir, os.path.basename(cached_path))
+        shutil.copyfile(cached_path, dest)
+        return dest
+
+    # Redactors write next to their input, so work on a private copy
+    with tempfile.TemporaryDirectory(dir=dest_dir, prefix=".work-") as work_dir:
+        work_path = os.path.join(work_dir, os.path.basename(src))
+        try:
+            os.link(src, work_path)
+        except OSError:
+            shutil.copyfile(src, work_path)
+        redacted_path = handle_file(work_path, redaction_type, redaction_level)
+        cache.put(key, redacted_path)
+        dest = os.path.join(dest_dir, os.path.basename(redacted_path))
+        os.replace(redacted_path, dest)
+    return dest
+
+
+def pool_submitter(pool, deadline=None):
+    """``submit`` for ``BatchRun.run`` over the API's ``RedactionPool``:
+    waits for room when the queue is full, until ``deadline`` (a
+    ``time.monotonic()`` value) when given, then raises ``PoolFull``."""
+    def submit(fn, *args):
+        while True:
+            try:
+                return pool.submit(fn, *args)
+            except PoolFull as exc:
+                wait_for = exc.retry_after
+                if deadline is not None:
+                    wait_for = min(wait_for, deadline - time.monotonic())
+                    if wait_for <= 0:
+                        raise
+                time.sleep(wait_for)
+    return submit
+
+
+def run_batch_job(store, job_id, pool, timeout=None):
+    """Run a batch job whose files were unpacked into ``inputs/`` of its job
+    directory, over ``pool``: each file gets ``pool.timeout`` seconds and the
+    whole batch ``timeout`` (default ``BATCH_TIMEOUT``). Progress counts files
+    then packing ``redacted.zip``, which becomes the job's result."""
+    job = store.update(job_id, status="running")
+    if job is None or job["status"] != "running":
+        return None
+    job_dir = store.job_dir(job_id)
+    inputs_dir = os.path.join(job_dir, "inputs")
+    deadline = time.monotonic() + (BATCH_TIMEOUT if timeout is None else timeout)
+    progress = JobProgress(store, job_id)
+    try:
+        run = BatchRun(os.path.join(job_dir, "redacted"), job["redaction_type"], job["redaction_level"])
+        with stage("batch.redact"):
+            manifest = run.run(
+                collect(inputs_dir), pool_submitter(pool, deadline), pool.workers * 2,
+                progress=lambda done, total: progress(done, total + 1),
+                timeout=pool.timeout, deadline=deadline,
+            )
+        with stage("batch.zip"):
+            run.write_zip(os.path.join(job_dir, "redacted.zip"))
+    except Exception as exc:
+        store.update(job_id, status="failed", error=str(exc) or type(exc).__name__)
+        return None
+    finally:
+        shutil.rmtree(inputs_dir, ignore_errors=True)
+    total = sum(manifest["summary"].values()) + 1
+    return store.update(job_id, status="done", result="redacted.zip", progress={"done": total, "total": total})
+
+
+class BatchRun:
+    """Redacts a set of files into ``out_dir``, mirroring their relative paths.
+
+    Every finished file is appended to ``journal.jsonl`` (flushed and synced)
+    as soon as it completes, so a run that crashed or was killed picks up
+    where it left off: files already recorded as done, whose output still
+    exists, are skipped. ``manifest.json`` summarises the run at the end.
+    """
+
+    def __init__(self, out_dir, redaction_type, redaction_level):
+        self.out_dir = os.path.abspath(out_dir)
+        self.redaction_type = redaction_type
+        self.redaction_level = redaction_level
+        self.journal_path = os.path.join(self.out_dir, "journal.jsonl")
+        self.manifest_path = os.path.join(self.out_dir, "manifest.json")
+        self.entries = {}
+        os.makedirs(self.out_dir, exist_ok=True)
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.journal_path) as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue  # torn last line of a crashed run
+                    if (entry.get("redaction_type"), entry.get("redaction_level")) == (
+                        self.redaction_type, self.redaction_level
+                    ):
+                        self.entries[entry["input"]] = entry
+        except FileNotFoundError:
+            pass
+
+    def is_done(self, relpath):
+        entry = self.entries.get(relpath)
+        return (
+            entry is not None
+            and entry["status"] == "done"
+            and os.path.exists(os.path.join(self.out_dir, entry["output"]))
+        )
+
+    def record(self, relpath, status, output=None, error=None, seconds=None):
+        entry = {
+            "input": relpath,
+            "status": status,
+            "output": output,
+            "error": error,
+            "seconds": seconds,
+            "redaction_type": self.redaction_type,
+            "redaction_level": self.redaction_level,
+        }
+        self.entries[relpath] = entry
+        with open(self.journal_path, "a") as f:
+            f.write(json.dumps(entry) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        return entry
+
+    def run(self, inputs, submit, window, progress=None, timeout=None, deadline=None):
+        """Redact ``inputs`` ((relative path, absolute path) pairs).
+
+        ``submit(fn, *args)`` schedules work (a process pool's ``submit``) and
+        at most ``window`` files are in flight at once. A file not finished
+        ``timeout`` seconds after it was submitted is recorded as failed, and
+        once ``deadline`` (a ``time.monotonic()`` value) passes so is every
+        file still queued or running. Returns the manifest.
+        """
+        todo = []
+        for relpath, path in inputs:
+            if self.is_done(relpath):
+                continue
+            if os.path.splitext(path)[-1].lower() not in SUPPORTED_EXTENSIONS:
+                self.record(relpath, "skipped", error="Unsupported file type")
+                continue
+            todo.append((relpath, path))
+
+        total = len(todo)
+        done = 0
+        queue = schedule(todo)
+        running = {}
+
+        def finish(relpath, status, **fields):
+            nonlocal done
+            self.record(relpath, status, **fields)
+            done += 1
+            if progress:
+                progress(done, total)
+
+        while queue or running:
+            while queue and len(running) < window:
+                relpath, path = queue.pop(0)
+                dest_dir = os.path.join(self.out_dir, os.path.dirname(relpath))
+                try:
+                    future = submit(redact_one, path, dest_dir, self.redaction_type, self.redaction_level)
+                except Exception as exc:
+                    finish(relpath, "failed", error=str(exc) or type(exc).__name__)
+                    continue
+                running[future] = (relpath, time.time(), time.monotonic())
+
+            now = time.monotonic()
+            if deadline is not None and now >= deadline:
+                for future, (relpath, started, _) in running.items():
+                    future.cancel()
+                    finish(relpath, "failed", error="Batch timed out", seconds=round(time.time() - started, 3))
+                for relpath, _ in queue:
+                    finish(relpath, "failed", error="Batch timed out")
+                break
+            if not running:
+                continue
+
+            # Wake up for the first file to finish or to time out
+            limits = [deadline] if deadline is not None else []
+            if timeout is not None:
+                limits.append(min(submitted for _, _, submitted in running.values()) + timeout)
+            finished, _ = wait(
+                running, timeout=max(0, min(limits) - now) if limits else None, return_when=FIRST_COMPLETED
+            )
+            for future in finished:
+                relpath, started, _ = running.pop(future)
+                seconds = round(time.time() - started, 3)
+                try:
+                    output = os.path.relpath(future.result(), self.out_dir).replace(os.sep, "/")
+                except Exception as exc:
+                    finish(relpath, "failed", error=str(exc) or type(exc).__name__, seconds=seconds)
+                else:
+                    finish(relpath, "done", output=output, seconds=seconds)
+
+            if timeout is not None:
+                now = time.monotonic()
+                for future, (relpath, started, submitted) in list(running.items()):
+                    if now - submitted >= timeout:
+                        del running[future]
+                        future.cancel()
+                        finish(relpath, "failed", error="Redaction timed out", seconds=round(time.time() - started, 3))
+
+        return self.write_manifest()
+
+    def write_manifest(self):
+        files = sorted(self.entries.values(), key=lambda entry: entry["input"])
+        manifest = {
+            "redaction_type": self.redaction_type,
+            "redaction_level": self.redaction_level,
+            "summary": {
+                status: sum(1 for entry in files if entry["status"] == status)
+                for status in ("done", "failed", "skipped")
+            },
+            "files": [
+                {k: entry[k] for k in ("input", "status", "output", "error", "seconds")}
+                for entry in files
+            ],
+        }
+        tmp_path = self.manifest_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp_path, self.manifest_path)
+        return manifest
+
+    def write_zip(self, zip_path):
+        """Pack the redacted files and ``manifest.json`` into ``zip_path``."""
+        with zipfile.ZipFile(zip_path, "w", zipfile.ZIP_DEFLATED) as archive:
+            archive.write(self.manifest_path, "manifest.json")
+            for entry in self.entries.values():
+                if entry["status"] == "done":
+                    archive.write(os.path.join(self.out_dir, entry["output"]), entry["output"])
+        return zip_path
@@ -0,0 +1,278 @@
+# backend/app/cache.py
+import glob
+import hashlib
+import json
+import os
+import re
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict
+
+CHUNK_SIZE = 1024 * 1024
+
+# Intermediate artifacts (OCR words, entity lists) hold the raw sensitive
+# values, so they are kept in each process's memory unless explicitly allowed
+# on disk, where the retention policy expires them
+ARTIFACTS_ON_DISK = os.environ.get("REDACT_CACHE_ARTIFACTS_ON_DISK", "") in ("1", "true")
+ARTIFACTS_IN_MEMORY = int(os.environ.get("REDACT_CACHE_ARTIFACTS_IN_MEMORY", 4096))
+
+
+def _engine_version():
+    # Hash of the engine sources and of the REDACT_* settings they read, so
+    # any change that can alter the output also changes the cache keys
+    app_dir = os.path.dirname(os.path.abspath(__file__))
+    paths = sorted(glob.glob(os.path.join(app_dir, "model", "*.py"))) + [os.path.join(app_dir, "com.py")]
+    digest = hashlib.sha256()
+    settings = set()
+    for path in paths:
+        with open(path, "rb") as f:
+            source = f.read()
+        digest.update(os.path.basename(path).encode() + b"\0" + source + b"\0")
+        settings.update(re.findall(rb'"(REDACT_[A-Z0-9_]+)"', source))
+    for name in sorted(settings):
+        value = os.environ.get(name.decode())
+        digest.update(name + b"=" + (value.encode() if value is not None else b"\0") + b"\n")
+    return digest.hexdigest()[:16]
+
+
+ENGINE_VERSION = _engine_version()
+
+
+class ResultCache:
+    """Content-addressed on-disk cache with size-bounded LRU eviction.
+
+    ``results/<key>/`` holds a finished redacted file, keyed on the upload's
+    SHA-256 and extension, the redaction type and level and
+    ``ENGINE_VERSION``.
+    Intermediate results (OCR words, entity lists) do not depend on the
+    redaction type and are reused when only that changes. They are kept in an
+    in-process LRU of ``ARTIFACTS_IN_MEMORY`` entries, or with
+    ``REDACT_CACHE_ARTIFACTS_ON_DISK`` as JSON under ``artifacts/<digest>/``.
+    Entries on disk are touched on every hit and the least recently used ones
+    are evicted once the cache exceeds ``max_bytes``.
+    """
+
+    _default = None
+    _default_lock = threading.Lock()
+
+    def __init__(self, root=None, max_bytes=None, artifacts_on_disk=None):
+        self.root = os.path.abspath(root or os.environ.get("REDACT_CACHE_DIR", "cache"))
+        if max_bytes is None:
+            max_bytes = int(float(os.environ.get("REDACT_CACHE_MAX_MB", 1024)) * 2**20)
+        self.max_bytes = max_bytes
+        self.results_dir = os.path.join(self.root, "results")
+        self.artifacts_dir = os.path.join(self.root, "artifacts")
+        self.artifacts_on_disk = ARTIFACTS_ON_DISK if artifacts_on_disk is None else artifacts_on_disk
+        os.makedirs(self.results_dir, exist_ok=True)
+        if self.artifacts_on_disk:
+            os.makedirs(self.artifacts_dir, exist_ok=True)
+        self._approx_bytes = None
+        self._memory = OrderedDict()
+        self._memory_lock = threading.Lock()
+
+    @classmethod
+    def default(cls):
+        """The cache shared by everything in this process."""
+        with cls._default_lock:
+            if cls._default is None:
+                cls._default = cls()
+            return cls._default
+
+    @property
+    def enabled(self):
+        return self.max_bytes > 0
+
+    @staticmethod
+    def key(digest, filename, redaction_type, redaction_level):
+        # The extension picks the redactor, so it is part of the key too
+        ext = os.path.splitext(filename)[-1].lower()
+        raw = f"{digest}:{ext}:{redaction_type}:{redaction_level}:{ENGINE_VERSION}"
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+    @staticmethod
+    def text_digest(text):
+        return hashlib.sha256(text.encode("utf-8", "surrogatepass")).hexdigest()
+
+    @staticmethod
+    def file_digest(path):
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    @staticmethod
+    def write_hashed(fileobj, path):
+        """Copy ``fileobj`` to ``path`` and return the SHA-256 of its bytes,
+        in the same single pass."""
+        digest = hashlib.sha256()
+        with open(path, "wb") as out:
+            for chunk in iter(lambda: fileobj.read(CHUNK_SIZE), b""):
+                digest.update(chunk)
+                out.write(chunk)
+        return digest.hexdigest()
+
+    @staticmethod
+    def _touch(path):
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            pass
+
+    def get(self, key):
+        """Path of the cached result for ``key``, or None."""
+        if not self.enabled:
+            return None
+        entry = os.path.join(self.results_dir, key)
+        try:
+            names = os.listdir(entry)
+        except FileNotFoundError:
+            return None
+        if not names:
+            return None
+        self._touch(entry)
+        return os.path.join(entry, names[0])
+
+    def put(self, key, path):
+        """Store a copy of ``path`` under ``key`` and return the cached path."""
+        if not self.enabled:
+            return path
+        entry = os.path.join(self.results_dir, key)
+        if not os.path.isdir(entry):
+            staging = tempfile.mkdtemp(dir=self.results_dir, prefix=".tmp-")
+            target = os.path.join(staging, os.path.basename(path))
+            try:
+                os.link(path, target)
+            except OSError:
+                shutil.copyfile(path, target)
+            try:
+                os.rename(staging, entry)
+            except OSError:
+                # Another worker stored the same result first
+                shutil.rmtree(staging, ignore_errors=True)
+            else:
+                self._account(os.path.getsize(path))
+        return self.get(key) or path
+
+    def put_bytes(self, key, filename, data):
+        """Store ``data`` as ``filename`` under ``key``, for results that were
+        produced in memory; returns the cached path (None when disabled)."""
+        if not self.enabled:
+            return None
+        entry = os.path.join(self.results_dir, key)
+        if not os.path.isdir(entry):
+            staging = tempfile.mkdtemp(dir=self.results_dir, prefix=".tmp-")
+            with open(os.path.join(staging, os.path.basename(filename)), "wb") as f:
+                f.write(data)
+            try:
+                os.rename(staging, entry)
+            except OSError:
+                # Another worker stored the same result first
+                shutil.rmtree(staging, ignore_errors=True)
+            else:
+                self._account(len(data))
+        return self.get(key)
+
+    def _artifact_path(self, digest, name):
+        return os.path.join(self.artifacts_dir, digest, f"{name}.v{ENGINE_VERSION}.json")
+
+    def load_artifact(self, digest, name):
+        if not self.enabled:
+            return None
+        if not self.artifacts_on_disk:
+            with self._memory_lock:
+                data = self._memory.get((digest, name))
+                if data is not None:
+                    self._memory.move_to_end((digest, name))
+                return data
+        path = self._artifact_path(digest, name)
+        try:
+            with open(path) as f:
+                data = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+        self._touch(path)
+        return data
+
+    def store_artifact(self, digest, name, data):
+        if not self.enabled:
+            return
+        if not self.artifacts_on_disk:
+            with self._memory_lock:
+                self._memory[(digest, name)] = data
+                self._memory.move_to_end((digest, name))
+                while len(self._memory) > ARTIFACTS_IN_MEMORY:
+                    self._memory.popitem(last=False)
+            return
+        entry = os.path.join(self.artifacts_dir, digest)
+        os.makedirs(entry, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=entry, prefix=".tmp-")
+        with os.fdopen(fd, "w") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, self._artifact_path(digest, name))
+        self._account(os.path.getsize(self._artifact_path(digest, name)))
+
+    def artifact(self, digest, name, compute):
+        """Return the cached JSON artifact ``name`` for ``digest``, computing
+        and storing it on a miss."""
+        data = self.load_artifact(digest, name)
+        if data is None:
+            data = compute()
+            self.store_artifact(digest, name, data)
+        return data
+
+    def _entries(self):
+        # (last use, size, path) for every result entry and artifact file
+        for key in os.listdir(self.results_dir):
+            entry = os.path.join(self.results_dir, key)
+            if key.startswith(".tmp-"):
+                continue
+            try:
+                size = sum(
+                    os.path.getsize(os.path.join(entry, name)) for name in os.listdir(entry)
+                )
+                yield os.path.getmtime(entry), size, entry
+            except OSError:
+                continue
+        if not self.artifacts_on_disk:
+            return
+        for digest in os.listdir(self.artifacts_dir):
+            entry = os.path.join(self.artifacts_dir, digest)
+            try:
+                for name in os.listdir(entry):
+                    if name.startswith(".tmp-"):
+                        continue
+                    path = os.path.join(entry, name)
+                    stat = os.stat(path)
+                    yield stat.st_mtime, stat.st_size, path
+            except OSError:
+                continue
+
+    def _account(self, nbytes):
+        # Running estimate of the cache size, so the directory is only walked
+        # when the estimate says the quota may be exceeded. Other processes
+        # write too, which the walk in evict() corrects for.
+        if self._approx_bytes is None:
+            self._approx_bytes = sum(size for _, size, _ in self._entries())
+        else:
+            self._approx_bytes += nbytes
+        if self._approx_bytes > self.max_bytes:
+            self.evict()
+
+    def evict(self):
+        """Drop least recently used entries until the cache fits ``max_bytes``."""
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            if os.path.isdir(path):
+                shutil.rmtree(path, ignore_errors=True)
+            else:
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+            total -= size
+        self._approx_bytes = total
@@ -0,0 +1,51 @@
+# backend/app/cli.py
+"""Redact every file under a directory tree.
+
+Run from backend/:
+
+    python -m app.cli INPUT_DIR OUTPUT_DIR --type black --level 75 --workers 8
+
+Results mirror the input tree under OUTPUT_DIR, next to a manifest.json.
+Re-running the same command after a crash skips files that are already done.
+"""
+import argparse
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from app.batch import BatchRun, collect
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("input_dir")
+    parser.add_argument("output_dir")
+    parser.add_argument("--type", default="black", dest="redaction_type", choices=("black", "blur", "synthetic"))
+    parser.add_argument("--level", type=int, default=100, dest="redaction_level", choices=(25, 50, 75, 100))
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--zip", dest="zip_path", help="also pack the results and manifest into this zip")
+    args = parser.parse_args(argv)
+
+    input_dir = os.path.abspath(args.input_dir)
+    output_dir = os.path.abspath(args.output_dir)
+    if output_dir == input_dir or output_dir.startswith(input_dir + os.sep):
+        parser.error("output_dir must not be inside input_dir")
+
+    run = BatchRun(output_dir, args.redaction_type, args.redaction_level)
+
+    def progress(done, total):
+        print(f"\r{done}/{total} files", end="", file=sys.stderr, flush=True)
+
+    with ProcessPoolExecutor(max_workers=args.workers) as executor:
+        manifest = run.run(collect(input_dir), executor.submit, window=args.workers * 2, progress=progress)
+    print(file=sys.stderr)
+
+    if args.zip_path:
+        run.write_zip(args.zip_path)
+
+    summary = manifest["summary"]
+    print(f"{summary['done']} redacted, {summary['failed']} failed, {summary['skipped']} skipped -> {output_dir}")
+    return 1 if summary["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
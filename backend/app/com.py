@@ -1,18 +1,41 @@
 # backend/app/com.py
 import os
+from app.metrics import stage
 from app.model.PDFRedact import PDFRedactor
 from app.model.IMGRedact import ImageRedactor
 from app.model.DOCRedact import DOCRedactor
+from app.model.PresentRedactor import PresentationRedactor
+from app.model.XelRedactor import FileRedactor
+from app.model.Registry import ModelRegistry
 
+# File types handle_file can redact
+SUPPORTED_EXTENSIONS = (".pdf", ".png", ".jpg", ".jpeg", ".doc", ".docx", ".pptx", ".txt", ".csv", ".xlsx")
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg")
+
+
+def warm_up(names=None):
+    """Load the named models (default: every registered one) in this process."""
+    ModelRegistry.warm_up(names)
 
-def handle_file(file_path, redaction_type, redaction_level):
-    ext = os.path.splitext(file_path)[-1].lower()
 
-    if ext in [".pdf"]:
-        return PDFRedactor.redact(file_path, redaction_type, redaction_level)
-    elif ext in [".png", ".jpg", ".jpeg"]:
-        return ImageRedactor.redact(file_path, redaction_type, redaction_level)
-    elif ext in [".doc", ".docx"]:
-        return DOCRedactor.redact(file_path, redaction_type, redaction_level)
-    else:
+def handle_file(file_path, redaction_type, redaction_level, progress=None):
+    """Redact ``file_path`` and return the path of the redacted copy.
+
+    ``progress``, when given, is called as ``progress(done, total)`` as the
+    redactor works through pages, paragraphs, slides, rows or images.
+    """
+    ext = os.path.splitext(file_path)[-1].lower()
+    if ext not in SUPPORTED_EXTENSIONS:
         raise ValueError(f"Unsupported file type: {ext}")
+
+    with stage("file" + ext):
+        if ext in [".pdf"]:
+            return PDFRedactor.redact(file_path, redaction_type, redaction_level, progress=progress)
+        elif ext in [".png", ".jpg", ".jpeg"]:
+            return ImageRedactor.redact(file_path, redaction_type, redaction_level, progress=progress)
+        elif ext in [".doc", ".docx"]:
+            return DOCRedactor.redact(file_path, redaction_type, redaction_level, progress=progress)
+        elif ext in [".pptx"]:
+            return PresentationRedactor().redact(file_path, redaction_type, redaction_level, progress=progress)
+        elif ext in [".txt", ".csv", ".xlsx"]:
+            return FileRedactor().redact(file_path, redaction_type, redaction_level, progress=progress)
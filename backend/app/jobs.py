@@ -0,0 +1,173 @@
+# backend/app/jobs.py
+import fcntl
+import json
+import os
+import re
+import shutil
+import time
+import uuid
+from contextlib import contextmanager
+from app.cache import ResultCache
+from app.com import handle_file
+
+JOB_ID_RE = re.compile(r"^[0-9a-f]{32}$")
+# A job in one of these states never changes again
+TERMINAL = ("done", "failed")
+
+
+class JobStore:
+    """On-disk job store: one directory per job holding the upload, the
+    result and a ``job.json`` status file.
+
+    The status file is the only shared state between the API process and the
+    worker processes, so every write goes through a temp file and
+    ``os.replace`` to stay atomic, and updates hold a per-job file lock.
+    Once a job is done or failed it is final: a worker that finishes after
+    its job timed out cannot turn it back into ``done``.
+    """
+
+    def __init__(self, root=None):
+        self.root = os.path.abspath(root or os.environ.get("REDACT_JOB_DIR", "jobs"))
+        os.makedirs(self.root, exist_ok=True)
+
+    def job_dir(self, job_id):
+        if not JOB_ID_RE.match(job_id):
+            raise KeyError(job_id)
+        return os.path.join(self.root, job_id)
+
+    def reserve(self):
+        """Create an empty job directory (e.g. to stream an upload into) and
+        return its id; ``create`` then writes the job record."""
+        job_id = uuid.uuid4().hex
+        os.makedirs(self.job_dir(job_id))
+        return job_id
+
+    def create(self, filename, redaction_type, redaction_level, job_id=None):
+        job_id = job_id or self.reserve()
+        now = time.time()
+        job = {
+            "id": job_id,
+            "status": "queued",
+            "filename": os.path.basename(filename or "uploaded_file"),
+            "redaction_type": redaction_type,
+            "redaction_level": redaction_level,
+            "progress": {"done": 0, "total": None},
+            "result": None,
+            "error": None,
+            "created": now,
+            "updated": now,
+        }
+        self._write(job_id, job)
+        return job
+
+    def input_path(self, job):
+        return os.path.join(self.job_dir(job["id"]), job["filename"])
+
+    def result_path(self, job):
+        if not job.get("result"):
+            return None
+        return os.path.join(self.job_dir(job["id"]), job["result"])
+
+    def get(self, job_id):
+        try:
+            with open(os.path.join(self.job_dir(job_id), "job.json")) as f:
+                return json.load(f)
+        except (KeyError, FileNotFoundError):
+            return None
+
+    @contextmanager
+    def _locked(self, job_id):
+        try:
+            fd = os.open(os.path.join(self.job_dir(job_id), "job.lock"), os.O_RDWR | os.O_CREAT, 0o600)
+        except (KeyError, FileNotFoundError):
+            fd = None  # unknown or deleted job: get() will return None
+        try:
+            if fd is not None:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+            yield
+        finally:
+            if fd is not None:
+                os.close(fd)
+
+    def update(self, job_id, **fields):
+        """Apply ``fields`` and return the job; a job already in a terminal
+        state is returned unchanged."""
+        with self._locked(job_id):
+            job = self.get(job_id)
+            if job is None or job["status"] in TERMINAL:
+                return job
+            job.update(fields)
+            job["updated"] = time.time()
+            self._write(job_id, job)
+            return job
+
+    def complete_from(self, job_id, path, name=None):
+        """Mark a job done with an existing result file (e.g. a cache hit),
+        stored as ``name`` (default: its own name); a no-op once the job is
+        done or failed."""
+        with self._locked(job_id):
+            job = self.get(job_id)
+            if job is None or job["status"] in TERMINAL:
+                return job
+            target = os.path.join(self.job_dir(job_id), name or os.path.basename(path))
+            try:
+                os.link(path, target)
+            except OSError:
+                shutil.copyfile(path, target)
+            job.update(status="done", result=os.path.basename(target), updated=time.time())
+            self._write(job_id, job)
+            return job
+
+    def delete(self, job_id):
+        shutil.rmtree(self.job_dir(job_id), ignore_errors=True)
+
+    def _write(self, job_id, job):
+        path = os.path.join(self.job_dir(job_id), "job.json")
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(job, f)
+        os.replace(tmp_path, path)
+
+
+class JobProgress:
+    """Progress callback handed to the redactors; records units (pages,
+    slides, paragraphs) done out of total in the job status file."""
+
+    def __init__(self, store, job_id):
+        self.store = store
+        self.job_id = job_id
+        self.last = None
+
+    def __call__(self, done, total):
+        if (done, total) == self.last:
+            return
+        self.last = (done, total)
+        self.store.update(self.job_id, progress={"done": done, "total": total})
+
+
+def run_job(root, job_id, cache_key=None):
+    """Worker-side entry point: redact the job's upload and record the outcome."""
+    store = JobStore(root)
+    job = store.update(job_id, status="running")
+    if job is None or job["status"] != "running":
+        return None  # deleted, or already failed (timed out while queued)
+    progress = JobProgress(store, job_id)
+    try:
+        redacted_path = handle_file(
+            store.input_path(job),
+            job["redaction_type"],
+            job["redaction_level"],
+            progress=progress,
+        )
+    except Exception as exc:
+        store.update(job_id, status="failed", error=str(exc))
+        raise
+    if cache_key:
+        ResultCache.default().put(cache_key, redacted_path)
+    # Redactors that stream (tables) do not know their total up front
+    done, total = progress.last or (1, 1)
+    total = done if total is None else total
+    store.update(
+        job_id, status="done", result=os.path.basename(redacted_path), progress={"done": total, "total": total}
+    )
+    return redacted_path
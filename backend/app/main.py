@@ -1,12 +1,81 @@
-from fastapi import FastAPI, File, UploadFile, Form
-from fastapi.responses import FileResponse
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, File, Request, HTTPException, UploadFile
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse, PlainTextResponse, Response
 from fastapi.middleware.cors import CORSMiddleware
-from app.com import handle_file
+from starlette.background import BackgroundTask
+from app.batch import extract_zip, run_batch_job
+from app.cache import ResultCache
+from app.com import IMAGE_EXTENSIONS, handle_file, warm_up
+from app.jobs import JobStore, run_job
+from app.metrics import PROFILE_DIR, profile_path, render, stage
+from app.model.IMGRedact import ImageRedactor
+from app.model.Registry import ModelRegistry
+from app.pool import RedactionPool, PoolFull
+from app.retention import RetentionPolicy
+from app import uploads
+from app.uploads import SPOOL_MAX_BYTES, RedactionLevel, RedactionType
+import asyncio
+import os
 import shutil
 import tempfile
-import os
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Annotated
+from urllib.parse import quote
+import zipfile
+
+# Models to load before serving: unset/empty for none, "all", or a comma list
+WARMUP = os.environ.get("REDACT_WARMUP", "")
+WARMUP_MODELS = None if WARMUP == "all" else [name for name in WARMUP.split(",") if name]
+
+# Per-request working directories; results are served from here and
+# removed by the retention policy
+RESULTS_DIR = os.path.abspath(os.environ.get("REDACT_RESULTS_DIR", "redacted_files"))
+RETENTION_INTERVAL = float(os.environ.get("REDACT_RETENTION_INTERVAL", 300))
+
+# Batch jobs are coordinated from threads of this process (the files run in
+# the worker pool); at most BATCH_MAX_PENDING are running or waiting
+BATCH_THREADS = int(os.environ.get("REDACT_BATCH_THREADS", 2))
+BATCH_MAX_PENDING = int(os.environ.get("REDACT_BATCH_MAX_PENDING", BATCH_THREADS * 4))
+
+pool = RedactionPool(initializer=warm_up, initargs=(WARMUP_MODELS,)) if WARMUP else RedactionPool()
+batches = ThreadPoolExecutor(max_workers=BATCH_THREADS, thread_name_prefix="batch")
+batch_slots = threading.BoundedSemaphore(BATCH_MAX_PENDING)
+jobs = JobStore()
+cache = ResultCache.default()
+retention = RetentionPolicy()
+
+
+async def _prune_forever():
+    roots = [RESULTS_DIR, jobs.root]
+    if cache.artifacts_on_disk:
+        # Artifacts hold raw OCR/NER output, so they expire like results
+        roots.append(cache.artifacts_dir)
+    if PROFILE_DIR:
+        roots.append(os.path.abspath(PROFILE_DIR))
+    while True:
+        for root in roots:
+            await run_in_threadpool(retention.prune, root)
+        await asyncio.sleep(RETENTION_INTERVAL)
+
+
+@asynccontextmanager
+async def lifespan(app):
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    # Forked workers inherit models loaded here; the pool initializer
+    # covers platforms that spawn workers instead.
+    if WARMUP:
+        await run_in_threadpool(warm_up, WARMUP_MODELS)
+    pruner = asyncio.get_running_loop().create_task(_prune_forever())
+    yield
+    pruner.cancel()
+    batches.shutdown(wait=False, cancel_futures=True)
+    pool.shutdown()
+
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 # ✅ Allow requests from Chrome extension
 app.add_middleware(
@@ -17,35 +86,234 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+def _file_response(path, filename=None, background=None):
+    return FileResponse(
+        path=path,
+        filename=filename or os.path.basename(path),
+        media_type="application/octet-stream",
+        background=background,
+    )
+
+def _bytes_response(data, filename):
+    # Same headers as _file_response, for results that never hit the disk
+    quoted = quote(filename)
+    if quoted != filename:
+        disposition = f"attachment; filename*=utf-8''{quoted}"
+    else:
+        disposition = f'attachment; filename="{filename}"'
+    return Response(
+        content=data,
+        media_type="application/octet-stream",
+        headers={"Content-Disposition": disposition},
+    )
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+def _queue_full(exc):
+    return HTTPException(
+        status_code=429,
+        detail="Redaction queue is full, retry later",
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
 @app.get("/")
 def hello():
     return {"message": "Backend is up"}
 
+@app.get("/models")
+def models():
+    # Redaction runs in the pool's workers; each reports its models when a
+    # job finishes, so a worker appears once it has run one
+    return {"api": ModelRegistry.stats(), "workers": pool.worker_models()}
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    return render(gauges=[
+        ("redact_pool_pending", "Jobs running or queued in the worker pool.", pool.pending),
+        ("redact_pool_workers", "Worker processes in the pool.", pool.workers),
+    ])
+
 @app.post("/redact")
 async def redact_file(
-    file: UploadFile = File(...),
-    redaction_type: str = Form(...),
-    redaction_level: int = Form(...),
+    request: Request,
+    file: Annotated[UploadFile, File()],
+    redaction_type: RedactionType,
+    redaction_level: RedactionLevel,
 ):
-    with tempfile.TemporaryDirectory() as tmpdirname:
-        original_filename = file.filename or "uploaded_file"
-        file_path = os.path.join(tmpdirname, original_filename)
+    work_dir = os.path.join(RESULTS_DIR, uuid.uuid4().hex)
+    os.makedirs(work_dir)
+    filename = uploads.filename(file)
 
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+    try:
+        # 🖼️ Small images are decoded, redacted and encoded in the worker
+        # without touching the disk
+        in_memory = (
+            file.size is not None and file.size <= SPOOL_MAX_BYTES
+            and os.path.splitext(filename)[-1].lower() in IMAGE_EXTENSIONS
+        )
 
-        # 🧠 Redact inside temp folder
-        redacted_path = handle_file(file_path, redaction_type, redaction_level)
+        # 📥 Copy the upload in, hashing it on the way
+        with stage("api.upload"):
+            if in_memory:
+                data, digest = await run_in_threadpool(uploads.read, file)
+            else:
+                path, digest = await run_in_threadpool(uploads.save, file, work_dir)
 
-        # ✅ Move redacted file OUTSIDE tempdir before it gets deleted
-        output_dir = "redacted_files"
-        os.makedirs(output_dir, exist_ok=True)
+        # 🔑 Identical uploads are answered from the cache
+        cache_key = ResultCache.key(digest, filename, redaction_type, redaction_level)
+        with stage("api.cache"):
+            cached_path = cache.get(cache_key)
+        if cached_path:
+            shutil.rmtree(work_dir, ignore_errors=True)
+            # The cached file is named after whoever uploaded it first
+            return _file_response(cached_path, "redacted_" + filename)
 
-        final_path = os.path.join(output_dir, os.path.basename(redacted_path))
-        shutil.copyfile(redacted_path, final_path)
+        # 🧠 Redact in the working directory, off the event loop
+        profile = profile_path(request)
+        try:
+            with stage("api.redact"):
+                if in_memory:
+                    redacted = await pool.run(
+                        ImageRedactor.redact_bytes, data, filename, redaction_type, redaction_level,
+                        digest, profile_path=profile,
+                    )
+                else:
+                    redacted_path = await pool.run(
+                        handle_file, path, redaction_type, redaction_level, profile_path=profile
+                    )
+        except PoolFull as exc:
+            raise _queue_full(exc)
+        except asyncio.TimeoutError:
+            raise HTTPException(status_code=504, detail="Redaction timed out")
+    except BaseException:
+        shutil.rmtree(work_dir, ignore_errors=True)
+        raise
 
-    return FileResponse(
-        path=final_path,
-        filename=os.path.basename(final_path),
-        media_type="application/octet-stream",
-    )
+    if in_memory:
+        # ✅ Encoded bytes go straight into the response
+        shutil.rmtree(work_dir, ignore_errors=True)
+        with stage("api.cache_put"):
+            await run_in_threadpool(cache.put_bytes, cache_key, "redacted_" + filename, redacted)
+        response = _bytes_response(redacted, "redacted_" + filename)
+    else:
+        # ✅ Serve the worker's output in place; only the upload is dropped
+        with stage("api.cache_put"):
+            await run_in_threadpool(cache.put, cache_key, redacted_path)
+        cleanup = BackgroundTask(_remove, path) if redacted_path != path else None
+        response = _file_response(redacted_path, background=cleanup)
+    if profile:
+        response.headers["X-Redact-Profile"] = os.path.basename(profile)
+    return response
+
+@app.post("/redact/batch", status_code=202)
+async def redact_batch(
+    files: Annotated[list[UploadFile], File()],
+    redaction_type: RedactionType,
+    redaction_level: RedactionLevel,
+):
+    if not batch_slots.acquire(blocking=False):
+        raise _queue_full(PoolFull(pool.retry_after))
+    job_id = jobs.reserve()
+    inputs_dir = os.path.join(jobs.job_dir(job_id), "inputs")
+    os.makedirs(inputs_dir)
+
+    try:
+        # 📥 Any number of files and/or zip archives
+        with stage("batch.upload"):
+            for file in files:
+                path, _ = await run_in_threadpool(uploads.save, file, inputs_dir)
+                if path.lower().endswith(".zip"):
+                    # Each archive gets its own directory, so it can't clash
+                    # with other uploads or archives of the same name
+                    stem = os.path.splitext(os.path.basename(path))[0]
+                    try:
+                        dest_dir = tempfile.mkdtemp(prefix=stem + "_", dir=inputs_dir)
+                        await run_in_threadpool(extract_zip, path, dest_dir)
+                    except (ValueError, zipfile.BadZipFile) as exc:
+                        raise HTTPException(status_code=400, detail=f"{uploads.filename(file)}: {exc}")
+                    except OSError as exc:
+                        # e.g. a file and a directory of the same name; keep
+                        # server paths out of the message
+                        raise HTTPException(
+                            status_code=400,
+                            detail=f"{uploads.filename(file)}: could not extract ({exc.strerror or type(exc).__name__})",
+                        )
+                    os.remove(path)
+        job = jobs.create("inputs", redaction_type, redaction_level, job_id=job_id)
+    except BaseException:
+        batch_slots.release()
+        jobs.delete(job_id)
+        raise
+
+    # 🧠 Files are spread over the worker pool, most expensive first; the
+    # zip of results and manifest.json is served as the job's result
+    future = batches.submit(run_batch_job, jobs, job_id, pool)
+    future.add_done_callback(lambda _: batch_slots.release())
+    return {"id": job_id, "status": job["status"]}
+
+
+async def _watch_job(job_id, future):
+    # Record crashes and timeouts the worker itself could not write down
+    try:
+        await asyncio.wait_for(asyncio.wrap_future(future), pool.timeout)
+    except asyncio.TimeoutError:
+        future.cancel()
+        await run_in_threadpool(jobs.update, job_id, status="failed", error="Redaction timed out")
+    except Exception as exc:
+        # No-op when the worker already recorded the failure
+        await run_in_threadpool(jobs.update, job_id, status="failed", error=str(exc) or type(exc).__name__)
+
+@app.post("/jobs", status_code=202)
+async def submit_job(
+    file: Annotated[UploadFile, File()],
+    redaction_type: RedactionType,
+    redaction_level: RedactionLevel,
+):
+    job_id = jobs.reserve()
+
+    try:
+        path, digest = await run_in_threadpool(uploads.save, file, jobs.job_dir(job_id))
+    except BaseException:
+        jobs.delete(job_id)
+        raise
+
+    job = jobs.create(os.path.basename(path), redaction_type, redaction_level, job_id=job_id)
+
+    cache_key = ResultCache.key(digest, path, redaction_type, redaction_level)
+    cached_path = cache.get(cache_key)
+    if cached_path:
+        job = await run_in_threadpool(
+            jobs.complete_from, job_id, cached_path, "redacted_" + job["filename"]
+        )
+        _remove(path)
+        return {"id": job_id, "status": job["status"]}
+
+    try:
+        future = pool.submit(run_job, jobs.root, job_id, cache_key)
+    except PoolFull as exc:
+        jobs.delete(job_id)
+        raise _queue_full(exc)
+
+    asyncio.get_running_loop().create_task(_watch_job(job_id, future))
+    return {"id": job_id, "status": job["status"]}
+
+@app.get("/jobs/{job_id}")
+def job_status(job_id: str):
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown job")
+    return {k: job[k] for k in ("id", "status", "progress", "error", "created", "updated")}
+
+@app.get("/jobs/{job_id}/result")
+def job_result(job_id: str):
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown job")
+    if job["status"] != "done":
+        raise HTTPException(status_code=409, detail=f"Job is {job['status']}")
+
+    return _file_response(jobs.result_path(job))
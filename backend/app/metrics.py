@@ -0,0 +1,127 @@
+# backend/app/metrics.py
+import cProfile
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+# Upper bounds (seconds) of the stage histogram buckets
+BUCKETS = tuple(
+    float(b) for b in os.environ.get(
+        "REDACT_METRICS_BUCKETS", "0.005,0.01,0.025,0.05,0.1,0.25,0.5,1,2.5,5,10,30,60,120"
+    ).split(",")
+)
+
+# Where per-request profiles are written; profiling is off when unset
+PROFILE_DIR = os.environ.get("REDACT_PROFILE_DIR", "")
+PROFILE_HEADER = "x-redact-profile"
+
+
+class Histogram:
+    """Cumulative Prometheus histogram with one series per label value."""
+
+    def __init__(self, name, help, label, buckets=BUCKETS):
+        self.name = name
+        self.help = help
+        self.label = label
+        self.buckets = buckets
+        self.series = {}
+        self.lock = threading.Lock()
+
+    def observe(self, value, seconds):
+        with self.lock:
+            series = self.series.get(value)
+            if series is None:
+                series = self.series[value] = [[0] * len(self.buckets), 0.0, 0]
+            counts = series[0]
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    counts[i] += 1
+            series[1] += seconds
+            series[2] += 1
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self.lock:
+            for value, (counts, total, count) in sorted(self.series.items()):
+                label = f'{self.label}="{value}"'
+                for bound, n in zip(self.buckets, counts):
+                    lines.append(f'{self.name}_bucket{{{label},le="{bound:g}"}} {n}')
+                lines.append(f'{self.name}_bucket{{{label},le="+Inf"}} {count}')
+                lines.append(f"{self.name}_sum{{{label}}} {total:.6f}")
+                lines.append(f"{self.name}_count{{{label}}} {count}")
+        return lines
+
+
+STAGES = Histogram("redact_stage_seconds", "Time spent in each redaction stage.", "stage")
+
+# Set while a pool worker runs a task: its stage timings are buffered here
+# and shipped back with the result instead of going to this process's
+# histograms, which nothing scrapes.
+_collected = None
+
+
+def observe(name, seconds):
+    collected = _collected
+    if collected is not None:
+        collected.append((name, seconds))
+    else:
+        STAGES.observe(name, seconds)
+
+
+@contextmanager
+def stage(name):
+    """Time the enclosed block as stage ``name``."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, time.perf_counter() - start)
+
+
+def merge(samples):
+    """Record stage timings collected in a worker process (buffered in turn
+    when this process is itself a worker)."""
+    for name, seconds in samples:
+        observe(name, seconds)
+
+
+def collect(fn, args, profile_path=None):
+    """Worker entry point used by ``RedactionPool``: run ``fn(*args)`` and
+    return ``(result, samples)``. On failure the samples ride along on the
+    exception as ``stage_samples``. With ``profile_path`` the call is run
+    under cProfile and the stats are dumped there."""
+    global _collected
+    samples = _collected = []
+    profiler = cProfile.Profile() if profile_path else None
+    try:
+        if profiler:
+            profiler.enable()
+        return fn(*args), samples
+    except BaseException as exc:
+        exc.stage_samples = samples
+        raise
+    finally:
+        if profiler:
+            profiler.disable()
+            os.makedirs(os.path.dirname(profile_path), exist_ok=True)
+            profiler.dump_stats(profile_path)
+        _collected = None
+
+
+def profile_path(request):
+    """Where to dump a profile of ``request``, or None when the client did not
+    ask for one (``X-Redact-Profile: 1``) or profiling is disabled."""
+    if not PROFILE_DIR or request.headers.get(PROFILE_HEADER, "") not in ("1", "true"):
+        return None
+    return os.path.join(os.path.abspath(PROFILE_DIR), f"{uuid.uuid4().hex}.prof")
+
+
+def render(gauges=()):
+    """All metrics in the Prometheus text exposition format. ``gauges`` adds
+    ``(name, help, value)`` point-in-time values."""
+    lines = STAGES.render()
+    for name, help, value in gauges:
+        lines += [f"# HELP {name} {help}", f"# TYPE {name} gauge", f"{name} {value}"]
+    return "\n".join(lines) + "\n"
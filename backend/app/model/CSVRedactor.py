@@ -1,61 +1,46 @@
 import os
-import re
-import pandas as pd
+from app.model.XelRedactor import redact_columns, stream_lines, stream_csv, stream_xlsx
+from app.model.Detector import PatternDetector
+from app.model.Spans import SpanRewriter
 
-def redact_text(text, symbol="█"):
-    """Redacts text with a given symbol."""
-    return symbol * len(text)
+# Redaction thresholds for the labels of sensitive information (see PatternDetector)
+REDACTION_LEVELS = [
+    (25, "IPV4"),
+    (50, "DATE"),
+    (75, "TIME"),
+    (100, "RELAY"),
+]
+
+def labels_for(redaction_scale):
+    return [label for threshold, label in REDACTION_LEVELS if redaction_scale >= threshold]
 
 def redact_line(line, redaction_scale, option):
     """Redacts sensitive information in a single line based on redaction scale."""
-    ip_pattern = r'\b(?:\d{1,3}\.){3}\d{1,3}\b'
-    date_pattern = r'\b\d{4}-\d{2}-\d{2}\b|\b\d{1,2}[A-Za-z]+\d{2}\b'
-    time_pattern = r'\b\d{2}:\d{2}:\d{2}\b'
-    relay_pattern = r'relay=.*?@.*? '
-
-    patterns = [
-        (25, ip_pattern),
-        (50, date_pattern),
-        (75, time_pattern),
-        (100, relay_pattern)
-    ]
-
-    for threshold, pattern in patterns:
-        if redaction_scale >= threshold:
-            matches = re.finditer(pattern, line)
-            for match in matches:
-                redacted = redact_text(match.group()) if option.lower() != 'blur' else redact_text(match.group(), "-")
-                line = line.replace(match.group(), redacted)
-
-    return line
-
-def redact_file(input_file, output_file, redaction_scale, option):
-    """Handles file redaction for .txt, .csv, .xlsx, and .11 formats."""
+    spans = PatternDetector.scan(line, labels_for(redaction_scale), 'csv')
+    return SpanRewriter.rewrite(line, spans, 'blur' if option.lower() == 'blur' else 'black')
+
+def redact_frame(df, redaction_scale, option, always_redact=(), never_redact=()):
+    """Redacts the string columns of a DataFrame chunk."""
+    redaction_type = 'blur' if option.lower() == 'blur' else 'black'
+    return redact_columns(df, labels_for(redaction_scale), redaction_type, always_redact, never_redact, 'csv')
+
+def redact_file(input_file, output_file, redaction_scale, option, progress=None, always_redact=(), never_redact=()):
+    """Handles file redaction for .txt, .csv, .xlsx, and .11 formats, streaming
+    the input so memory use does not grow with the file size. Table columns
+    named in ``always_redact``/``never_redact`` skip detection."""
     file_extension = input_file.split('.')[-1].lower()
 
     if file_extension in ['txt', '11']:
-        with open(input_file, 'r') as f:
-            lines = f.readlines()
-
-        redacted_lines = [redact_line(line.strip(), redaction_scale, option) for line in lines]
-
-        with open(output_file, 'w') as f:
-            for redacted_line in redacted_lines:
-                f.write(redacted_line + '\n')
+        stream_lines(input_file, output_file, lambda line: redact_line(line, redaction_scale, option), progress)
 
     elif file_extension == 'csv':
-        df = pd.read_csv(input_file)
-        redacted_df = df.apply(lambda row: row.apply(lambda x: redact_line(str(x), redaction_scale, option) if isinstance(x, str) else x), axis=1)
-        redacted_df.to_csv(output_file, index=False)
+        stream_csv(input_file, output_file, lambda df: redact_frame(df, redaction_scale, option, always_redact, never_redact), progress)
 
     elif file_extension == 'xlsx':
-        df = pd.read_excel(input_file)
-        redacted_df = df.apply(lambda row: row.apply(lambda x: redact_line(str(x), redaction_scale, option) if isinstance(x, str) else x), axis=1)
-        redacted_df.to_excel(output_file, index=False)
+        stream_xlsx(input_file, output_file, lambda df: redact_frame(df, redaction_scale, option, always_redact, never_redact), progress)
 
     else:
         print(f"Unsupported file format: {file_extension}")
         return
 
-    print(f"Redacted file saved as {output_file}")
-
+    return output_file
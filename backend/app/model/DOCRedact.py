@@ -1,102 +1,80 @@
-import spacy
-import re
 import os
-from faker import Faker
+from app.cache import ResultCache
+from app.metrics import stage
+from app.model.NER import NERService
+from app.model.Pseudonyms import PseudonymEngine
+from app.model.Detector import PatternDetector, Span, LiteralMatcher
+from app.model.Spans import SpanRewriter
 from docx import Document
+from docx.text.hyperlink import Hyperlink
 
 class DOCRedactor:
-    nlp = spacy.load("en_core_web_sm")
-    fake = Faker()
+    NER_LABELS = ('PERSON', 'GPE', 'ORG', 'DATE', 'MONEY')
+    PATTERN_LABELS = ('EMAIL', 'PHONE', 'IPV4', 'IPV6', 'TIME')
 
     @staticmethod
-    def extract_text_and_coordinates(docx_path):
-        doc = Document(docx_path)
-        text = ""
-        paragraphs = []
-
-        for para_num, para in enumerate(doc.paragraphs):
-            text += para.text + "\n"
-            paragraphs.append({"text": para.text, "para_num": para_num})
-
-        return text, paragraphs
-
-    @staticmethod
-    def extract_sensitive_data(text):
-        doc = DOCRedactor.nlp(text)
-        sensitive_data = []
-
-        for ent in doc.ents:
-            if ent.label_ in ['PERSON', 'GPE', 'ORG', 'DATE', 'MONEY']:
-                sensitive_data.append((ent.start, ent.end, ent.text, ent.label_))
-
-        patterns = {
-            'EMAIL': r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}\b',
-            'PHONE': r'\b(\+?[0-9]{1,3})?[-. ]?(\(?\d{3}\)?[-. ]?\d{3}[-. ]?\d{4})\b',
-            'IPV4': r'\b(?:[0-9]{1,3}\.){3}[0-9]{1,3}\b',
-            'IPV6': r'\b(?:[A-Fa-f0-9]{1,4}:){7}[A-Fa-f0-9]{1,4}\b',
-            'TIME': r'\b([01]?[0-9]|2[0-3]):([0-5][0-9])\b',
-        }
-
-        for label, pattern in patterns.items():
-            matches = re.findall(pattern, text)
-            for match in matches:
-                value = match if isinstance(match, str) else ":".join(match)
-                sensitive_data.append((0, 0, value, label))
-
-        return sensitive_data
-
-    @staticmethod
-    def generate_synthetic_data(label):
-        fake = DOCRedactor.fake
-        return {
-            'EMAIL': fake.email(),
-            'PHONE': fake.phone_number(),
-            'PERSON': fake.name(),
-            'GPE': fake.city(),
-            'ORG': fake.company(),
-            'DATE': fake.date(),
-            'MONEY': fake.pricetag(),
-            'IPV4': fake.ipv4(),
-            'IPV6': fake.ipv6(),
-            'TIME': fake.time()
-        }.get(label, "SYNTHETIC_DATA")
-
-    @staticmethod
-    def redact_blackout(obj, sensitive_text):
-        obj.text = obj.text.replace(sensitive_text, "█" * len(sensitive_text))
+    def iter_block_paragraphs(container, seen):
+        """Paragraphs of a body, cell, header or footer, including those in
+        (nested) tables, each visited once even across merged cells."""
+        for paragraph in container.paragraphs:
+            yield paragraph
+        for table in container.tables:
+            for row in table.rows:
+                for cell in row.cells:
+                    # Merged cells show up once per grid position
+                    if id(cell._tc) in seen:
+                        continue
+                    seen.add(id(cell._tc))
+                    yield from DOCRedactor.iter_block_paragraphs(cell, seen)
 
     @staticmethod
-    def redact_blur(obj, sensitive_text):
-        obj.text = obj.text.replace(sensitive_text, "-" * len(sensitive_text))
+    def iter_paragraphs(doc):
+        """Every paragraph of the document: body, tables, headers and footers."""
+        seen = set()
+        yield from DOCRedactor.iter_block_paragraphs(doc, seen)
+        for section in doc.sections:
+            for part in (
+                section.header, section.first_page_header, section.even_page_header,
+                section.footer, section.first_page_footer, section.even_page_footer,
+            ):
+                # Linked parts belong to an earlier section, already visited
+                if part.is_linked_to_previous or id(part._element) in seen:
+                    continue
+                seen.add(id(part._element))
+                yield from DOCRedactor.iter_block_paragraphs(part, seen)
 
     @staticmethod
-    def replace_with_synthetic_data(obj, sensitive_text, label):
-        synthetic = DOCRedactor.generate_synthetic_data(label)
-        obj.text = obj.text.replace(sensitive_text, synthetic)
+    def paragraph_runs(paragraph):
+        """Runs of a paragraph in document order, including those in hyperlinks."""
+        runs = []
+        for item in paragraph.iter_inner_content():
+            if isinstance(item, Hyperlink):
+                runs.extend(item.runs)
+            else:
+                runs.append(item)
+        return runs
 
     @staticmethod
-    def redact_table(table, sensitive_data, action):
-        for row in table.rows:
-            for cell in row.cells:
-                for _, _, sensitive_text, label in sensitive_data:
-                    if sensitive_text in cell.text:
-                        if action == 'black':
-                            DOCRedactor.redact_blackout(cell, sensitive_text)
-                        elif action == 'blur':
-                            DOCRedactor.redact_blur(cell, sensitive_text)
-                        elif action == 'synthetic':
-                            DOCRedactor.replace_with_synthetic_data(cell, sensitive_text, label)
+    def extract_sensitive_data(texts):
+        """Entity ``Span`` lists, one per paragraph text."""
+        # Entities depend only on the text, so they are cached across
+        # redaction types and levels
+        def detect():
+            entities = NERService.entities_many(texts, DOCRedactor.NER_LABELS)
+            for text, spans in zip(texts, entities):
+                spans.extend(PatternDetector.scan(text, DOCRedactor.PATTERN_LABELS))
+            return entities
+
+        if not any(text.strip() for text in texts):
+            return [[] for _ in texts]
+        cached = ResultCache.default().artifact(
+            ResultCache.text_digest("\n".join(texts)), "doc-paragraph-entities", detect
+        )
+        return [[Span(*item) for item in spans] for spans in cached]
 
     @staticmethod
-    def redact(file_path: str, redaction_type: str, redaction_level: int) -> str:
-        doc_text, _ = DOCRedactor.extract_text_and_coordinates(file_path)
-        sensitive_data = DOCRedactor.extract_sensitive_data(doc_text)
-        if not sensitive_data:
-            return file_path  # no changes needed
-
-        doc = Document(file_path)
+    def entities_for_level(redaction_level):
         entities_to_redact = set()
-
         if redaction_level >= 25:
             entities_to_redact.update(['EMAIL', 'PHONE', 'IPV4', 'IPV6'])
         if redaction_level >= 50:
@@ -105,33 +83,56 @@ class DOCRedactor:
             entities_to_redact.update(['MONEY', 'ORG', 'GPE'])
         if redaction_level == 100:
             entities_to_redact.update(['PERSON'])
+        return entities_to_redact
 
-        filtered_data = [d for d in sensitive_data if d[3] in entities_to_redact]
-
-        for _, _, sensitive_text, label in filtered_data:
-            for para in doc.paragraphs:
-                if sensitive_text in para.text:
-                    if redaction_type == 'black':
-                        DOCRedactor.redact_blackout(para, sensitive_text)
-                    elif redaction_type == 'blur':
-                        DOCRedactor.redact_blur(para, sensitive_text)
-                    elif redaction_type == 'synthetic':
-                        DOCRedactor.replace_with_synthetic_data(para, sensitive_text, label)
-
-        for table in doc.tables:
-            DOCRedactor.redact_table(table, filtered_data, redaction_type)
-
-        for section in doc.sections:
-            for header in section.header.paragraphs:
-                for _, _, sensitive_text, label in filtered_data:
-                    if sensitive_text in header.text:
-                        if redaction_type == 'black':
-                            DOCRedactor.redact_blackout(header, sensitive_text)
-                        elif redaction_type == 'blur':
-                            DOCRedactor.redact_blur(header, sensitive_text)
-                        elif redaction_type == 'synthetic':
-                            DOCRedactor.replace_with_synthetic_data(header, sensitive_text, label)
+    @staticmethod
+    def redact_runs(runs, spans, redaction_type, pseudonyms):
+        texts = [run.text for run in runs]
+        changed = SpanRewriter.rewrite_runs(texts, spans, redaction_type, synthetic=pseudonyms)
+        for i, text in changed.items():
+            runs[i].text = text
 
-        output_path = file_path.replace('.docx', '_redacted.docx')
-        doc.save(output_path)
+    @staticmethod
+    def redact(file_path: str, redaction_type: str, redaction_level: int, progress=None) -> str:
+        # Single load: the document is walked once to collect run texts, and
+        # only runs that overlap an entity are rewritten, keeping formatting
+        with stage("docx.load"):
+            doc = Document(file_path)
+            paragraphs = [DOCRedactor.paragraph_runs(p) for p in DOCRedactor.iter_paragraphs(doc)]
+            texts = ["".join(run.text for run in runs) for runs in paragraphs]
+
+        # Steps: detection, one per paragraph, saving
+        total = len(paragraphs) + 2
+        if progress:
+            progress(0, total)
+        entities_to_redact = DOCRedactor.entities_for_level(redaction_level)
+        with stage("docx.detect"):
+            found = {
+                (span.text, span.label)
+                for spans in DOCRedactor.extract_sensitive_data(texts)
+                for span in spans
+                if span.label in entities_to_redact
+            }
+        if not found:
+            return file_path  # no changes needed
+        if progress:
+            progress(1, total)
+
+        # An entity found anywhere is redacted everywhere it appears
+        matcher = LiteralMatcher(found)
+        pseudonyms = PseudonymEngine.default().for_document()
+        with stage("docx.rewrite"):
+            for para_num, (runs, text) in enumerate(zip(paragraphs, texts)):
+                spans = matcher.scan(text)
+                if spans:
+                    DOCRedactor.redact_runs(runs, spans, redaction_type, pseudonyms)
+                if progress:
+                    progress(para_num + 2, total)
+
+        root, ext = os.path.splitext(file_path)
+        output_path = root + "_redacted" + ext
+        with stage("docx.save"):
+            doc.save(output_path)
+        if progress:
+            progress(total, total)
         return output_path
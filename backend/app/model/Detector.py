@@ -0,0 +1,144 @@
+import re
+from collections import namedtuple
+from functools import lru_cache
+
+# A detected piece of sensitive text: character offsets into the scanned
+# text, the matched text itself and its entity label.
+Span = namedtuple("Span", ["start", "end", "text", "label"])
+
+
+class PatternDetector:
+    # Order matters: when two patterns match at the same position the one
+    # listed first wins, so the more specific formats come first.
+    PATTERNS = {
+        'EMAIL': r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}\b',
+        'RELAY': r'relay=.*?@.*? ',
+        'IPV6': r'\b(?:[A-Fa-f0-9]{1,4}:){7}[A-Fa-f0-9]{1,4}\b',
+        'IPV4': r'\b(?:[0-9]{1,3}\.){3}[0-9]{1,3}\b',
+        'HOSTNAME': r'\b[A-Za-z0-9.-]+\.com\b',
+        'AADHAAR': r'\b\d{4}[\s\-]?\d{4}[\s\-]?\d{4}\b',
+        'PAN': r'\b[A-Z]{5}[0-9]{4}[A-Z]\b',
+        'DATE': (
+            r'\b\d{4}-\d{2}-\d{2}\b'
+            r'|\b\d{1,2}[-/]\d{1,2}[-/]\d{2,4}\b'
+            r'|\b\d{1,2}(?i:jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)[a-z]*\d{2}\b'
+        ),
+        'TIME': r'\b(?:[01]?[0-9]|2[0-3]):[0-5][0-9](?::[0-5][0-9])?(?:\s?[APap][Mm])?\b',
+        'PHONE': r'(?<![\w+])(?:\+?[0-9]{1,3}[-. ]?)?\(?\d{3}\)?[-. ]?\d{3}[-. ]?\d{4}\b',
+        'MONEY': r'\$\d+(?:\.\d{2})?',
+        'PROTOCOL': r'\bTCP\b|\bUDP\b',
+        'NAME': r'\b[A-Z][a-z]+(?:\s[A-Z][a-z]+)+\b',  # crude full name guess
+    }
+
+    # Per-redactor overrides of PATTERNS, keeping what each redactor matched
+    # before the patterns were shared
+    PATTERN_SETS = {
+        'image': {
+            # The area code is optional: 7-digit local numbers are redacted too
+            'PHONE': r'\b(?:\+?[0-9]{1,3}[-.\s]?)?(?:\(?\d{3}\)?[-.\s]?)?\d{3}[-.\s]?\d{4}\b',
+        },
+        'file': {
+            'DATE': r'\b\d{4}-\d{2}-\d{2}\b',
+            'TIME': r'\b\d{2}:\d{2}:\d{2}\b',
+        },
+        'csv': {
+            'DATE': r'\b\d{4}-\d{2}-\d{2}\b|\b\d{1,2}[A-Za-z]+\d{2}\b',
+            'TIME': r'\b\d{2}:\d{2}:\d{2}\b',
+        },
+    }
+
+    @staticmethod
+    def patterns(pattern_set=None):
+        """PATTERNS with the overrides of ``pattern_set`` applied."""
+        return {**PatternDetector.PATTERNS, **PatternDetector.PATTERN_SETS.get(pattern_set, {})}
+
+    @staticmethod
+    @lru_cache(maxsize=None)
+    def compile(labels, pattern_set=None):
+        """Combine the patterns for ``labels`` into one alternation so a single
+        scan finds every label; the matching named group gives the label."""
+        parts = [
+            f"(?P<{label}>{pattern})"
+            for label, pattern in PatternDetector.patterns(pattern_set).items()
+            if label in labels
+        ]
+        if not parts:
+            return None
+        return re.compile("|".join(parts))
+
+    @staticmethod
+    @lru_cache(maxsize=None)
+    def compile_each(labels, pattern_set=None):
+        """(label, regex) per label, for re-checking overlaps."""
+        return tuple(
+            (label, re.compile(pattern))
+            for label, pattern in PatternDetector.patterns(pattern_set).items()
+            if label in labels
+        )
+
+    @staticmethod
+    def finditer(text, labels=None, pattern_set=None):
+        """Yield a ``Span`` for every match of ``labels`` (default: all) in
+        ``text``, in order of position.
+
+        The combined pattern finds, in one scan, a match wherever any label
+        matches. A match of another label that overlaps it can only start
+        inside it, so each match is re-checked label by label over its own
+        stretch of text and those overlapping matches are yielded as well.
+        """
+        labels = frozenset(PatternDetector.PATTERNS if labels is None else labels)
+        regex = PatternDetector.compile(labels, pattern_set)
+        if regex is None:
+            return
+        for match in regex.finditer(text):
+            yield Span(match.start(), match.end(), match.group(), match.lastgroup)
+            if len(labels) > 1:
+                yield from PatternDetector._overlapping(text, match, labels, pattern_set)
+
+    @staticmethod
+    def _overlapping(text, match, labels, pattern_set):
+        found = []
+        for label, single in PatternDetector.compile_each(labels, pattern_set):
+            if label == match.lastgroup:
+                continue
+            pos = match.start()
+            while pos < match.end():
+                other = single.match(text, pos)
+                if other is None or other.end() == pos:
+                    pos += 1
+                    continue
+                found.append(Span(pos, other.end(), other.group(), label))
+                pos = other.end()
+        return sorted(found)
+
+    @staticmethod
+    def scan(text, labels=None, pattern_set=None):
+        """Return all ``Span`` matches of ``labels`` in ``text``, in order."""
+        return list(PatternDetector.finditer(text, labels, pattern_set))
+
+
+class LiteralMatcher:
+    """Finds already-detected entity strings in other text units.
+
+    Entities found once on the whole document (e.g. by spaCy) have to be
+    located again in each paragraph, cell or shape. All of them are compiled
+    into one alternation, longest first, so each unit is scanned once.
+    """
+
+    def __init__(self, entities):
+        # entities: iterable of (text, label); the first label seen for a text wins
+        self.labels = {}
+        for text, label in entities:
+            if text and text not in self.labels:
+                self.labels[text] = label
+        literals = sorted(self.labels, key=len, reverse=True)
+        self.regex = re.compile("|".join(map(re.escape, literals))) if literals else None
+
+    def finditer(self, text):
+        if self.regex is None or not text:
+            return
+        for match in self.regex.finditer(text):
+            yield Span(match.start(), match.end(), match.group(), self.labels[match.group()])
+
+    def scan(self, text):
+        return list(self.finditer(text))
@@ -1,112 +1,250 @@
 import cv2
-import pytesseract
-import re
 import os
 import numpy as np
-from faker import Faker
-import dlib
+from app.cache import ResultCache
+from app.metrics import stage
+from app.model.Detector import PatternDetector
+from app.model.OCR import OCRPipeline, OCRTextIndex
+from app.model.Pseudonyms import PseudonymEngine
+from app.model.Registry import ModelRegistry
 
 class ImageRedactor:
-    fake = Faker()
+    PATTERN_LABELS = ('EMAIL', 'PHONE', 'AADHAAR', 'PAN', 'DATE', 'NAME')
 
-    # Face Detection Setup
-    face_detector = dlib.get_frontal_face_detector()
+    # Face Detection Setup (models are loaded on first use, see load_* below)
     model_path = os.path.join(os.path.dirname(__file__), "shape_predictor_68_face_landmarks.dat")
-    landmark_predictor = dlib.shape_predictor(model_path)
+    # Face masks: 'ellipse' or 'box' (detector box only) or 'landmarks' (68-point hull)
+    FACE_MODE = os.environ.get("REDACT_FACE_MODE", "ellipse")
+    # Face detector: 'hog' (dlib) or 'dnn' (OpenCV res10 SSD, model files below)
+    FACE_DETECTOR = os.environ.get("REDACT_FACE_DETECTOR", "hog")
+    FACE_DETECT_SIDE = int(os.environ.get("REDACT_FACE_DETECT_SIDE", 1024))
+    FACE_DNN_PROTO = os.environ.get("REDACT_FACE_DNN_PROTO")
+    FACE_DNN_MODEL = os.environ.get("REDACT_FACE_DNN_MODEL")
+    FACE_DNN_CONFIDENCE = float(os.environ.get("REDACT_FACE_DNN_CONFIDENCE", 0.5))
+    # Smallest face blur: the 55x55, sigma 30 Gaussian faces always got
+    FACE_BLUR_KERNEL = 55
+    FACE_BLUR_SIGMA = 30
+    # Output encoding: JPEG quality (0-100) and PNG compression level (0-9)
+    JPEG_QUALITY = int(os.environ.get("REDACT_IMAGE_JPEG_QUALITY", 95))
+    PNG_COMPRESSION = int(os.environ.get("REDACT_IMAGE_PNG_COMPRESSION", 1))
 
     @staticmethod
-    def extract_sensitive_data(text):
-        patterns = {
-            'EMAIL': r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}\b',
-            'PHONE': r'\b(\+?[0-9]{1,3}[-.\s]?)?(\(?\d{3}\)?[-.\s]?)?\d{3}[-.\s]?\d{4}\b',
-            'AADHAAR': r'\b\d{4}[\s\-]?\d{4}[\s\-]?\d{4}\b',
-            'PAN': r'\b[A-Z]{5}[0-9]{4}[A-Z]\b',
-            'DATE': r'\b\d{1,2}[-/]\d{1,2}[-/]\d{2,4}\b',
-            'NAME': r'\b([A-Z][a-z]+(?:\s[A-Z][a-z]+)+)\b'  # crude full name guess
-        }
-
-        sensitive_matches = []
-        for label, pattern in patterns.items():
-            matches = re.findall(pattern, text)
-            for match in matches:
-                value = match if isinstance(match, str) else " ".join(match)
-                sensitive_matches.append((value.strip(), label))
-
-        return sensitive_matches
+    def load_face_detector():
+        import dlib
+        return dlib.get_frontal_face_detector()
 
     @staticmethod
-    def generate_synthetic_data(label):
-        return {
-            'EMAIL': ImageRedactor.fake.email(),
-            'PHONE': ImageRedactor.fake.phone_number(),
-            'AADHAAR': ImageRedactor.fake.bothify(text='#### #### ####'),
-            'PAN': ImageRedactor.fake.bothify(text='?????####?'),
-            'DATE': ImageRedactor.fake.date(),
-            'NAME': ImageRedactor.fake.name()
-        }.get(label, "SYNTHETIC")
+    def load_landmark_predictor():
+        import dlib
+        return dlib.shape_predictor(ImageRedactor.model_path)
 
     @staticmethod
-    def redact_faces(image):
-        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-        faces = ImageRedactor.face_detector(gray, 1)
-        for face in faces:
-            landmarks = ImageRedactor.landmark_predictor(gray, face)
-            points = np.array([[landmarks.part(i).x, landmarks.part(i).y] for i in range(68)])
-            hull = cv2.convexHull(points)
-            mask = np.zeros(image.shape[:2], dtype=np.uint8)
-            cv2.fillConvexPoly(mask, hull, 255)
-            blurred = cv2.GaussianBlur(image, (55, 55), 30)
-            image[mask == 255] = blurred[mask == 255]
-        return image
+    def extract_sensitive_data(text):
+        return [
+            (span.text.strip(), span.label)
+            for span in PatternDetector.finditer(text, ImageRedactor.PATTERN_LABELS, 'image')
+        ]
 
     @staticmethod
-    def redact(file_path: str, redaction_type: str, redaction_level: int) -> str:
-        image = cv2.imread(file_path)
-        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-
-        # Optional preprocessing
-        gray = cv2.bilateralFilter(gray, 11, 17, 17)
+    def load_face_dnn():
+        # OpenCV's res10 SSD face detector (Caffe prototxt + weights)
+        proto = ImageRedactor.FACE_DNN_PROTO
+        weights = ImageRedactor.FACE_DNN_MODEL
+        if not (proto and weights):
+            raise RuntimeError("Set REDACT_FACE_DNN_PROTO and REDACT_FACE_DNN_MODEL to use the DNN face detector")
+        return cv2.dnn.readNetFromCaffe(proto, weights)
 
-        # Tesseract OCR with Hindi + English
-        config = r'--oem 3 --psm 6 -l eng+hin'
-        data = pytesseract.image_to_data(gray, output_type=pytesseract.Output.DICT, config=config)
-        full_text = " ".join(data['text'])
+    @staticmethod
+    def detect_faces(image, detector=None):
+        """Face boxes (x0, y0, x1, y1) in ``image`` coordinates, detected on a
+        copy downscaled to ``FACE_DETECT_SIDE``."""
+        detector = detector or ImageRedactor.FACE_DETECTOR
+        height, width = image.shape[:2]
+        scale = min(1.0, ImageRedactor.FACE_DETECT_SIDE / max(height, width))
+        small = image if scale == 1.0 else cv2.resize(image, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+
+        boxes = []
+        if detector == 'dnn':
+            net = ModelRegistry.get("opencv:face_dnn", ImageRedactor.load_face_dnn)
+            net.setInput(cv2.dnn.blobFromImage(small, 1.0, (300, 300), (104.0, 177.0, 123.0)))
+            detections = net.forward()
+            sh, sw = small.shape[:2]
+            for i in range(detections.shape[2]):
+                if detections[0, 0, i, 2] < ImageRedactor.FACE_DNN_CONFIDENCE:
+                    continue
+                x0, y0, x1, y1 = detections[0, 0, i, 3:7] * np.array([sw, sh, sw, sh])
+                boxes.append((x0, y0, x1, y1))
+        else:
+            gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+            # Upsampling finds small faces; skip it once the image was shrunk
+            upsample = 1 if scale == 1.0 else 0
+            for face in ModelRegistry.get("dlib:face_detector")(gray, upsample):
+                boxes.append((face.left(), face.top(), face.right(), face.bottom()))
+
+        return [
+            (max(int(x0 / scale), 0), max(int(y0 / scale), 0), min(int(x1 / scale), width), min(int(y1 / scale), height))
+            for x0, y0, x1, y1 in boxes
+            if x1 > x0 and y1 > y0
+        ]
 
-        # Get sensitive entities
-        sensitive_items = ImageRedactor.extract_sensitive_data(full_text)
+    @staticmethod
+    def face_mask(image, box, mode, gray=None):
+        """Mask of the face in ``box``, the size of the padded ROI it covers;
+        returns (roi box, mask). ``gray`` is needed for ``landmarks``."""
+        x0, y0, x1, y1 = box
+        height, width = image.shape[:2]
+        # Detector boxes are tight around eyes and mouth; pad to cover hair and chin
+        pad_x, pad_y = (x1 - x0) // 5, (y1 - y0) // 4
+        rx0, ry0 = max(x0 - pad_x, 0), max(y0 - pad_y, 0)
+        rx1, ry1 = min(x1 + pad_x, width), min(y1 + pad_y, height)
+        mask = np.zeros((ry1 - ry0, rx1 - rx0), dtype=np.uint8)
+
+        if mode == 'box':
+            mask[:] = 255
+        elif mode == 'landmarks':
+            import dlib
+            landmarks = ModelRegistry.get("dlib:landmarks_68")(gray, dlib.rectangle(x0, y0, x1, y1))
+            points = np.array([[landmarks.part(i).x - rx0, landmarks.part(i).y - ry0] for i in range(68)])
+            cv2.fillConvexPoly(mask, cv2.convexHull(points), 255)
+        else:
+            center = ((rx1 - rx0) // 2, (ry1 - ry0) // 2)
+            cv2.ellipse(mask, center, (max(center[0], 1), max(center[1], 1)), 0, 0, 360, 255, -1)
+        return (rx0, ry0, rx1, ry1), mask
 
-        # Redact matched blocks
-        for i, word in enumerate(data['text']):
-            if not word.strip():
-                continue
+    @staticmethod
+    def redact_faces(image, mode=None, detector=None, boxes=None):
+        """Blur every detected face in place.
+
+        ``mode`` (``REDACT_FACE_MODE``) is ``ellipse`` or ``box`` for masks
+        taken straight from the detector box, or ``landmarks`` for the
+        68-point face hull. Only each face's ROI is blurred. ``boxes`` skips
+        detection with faces found by ``detect_faces`` already.
+        """
+        mode = mode or ImageRedactor.FACE_MODE
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if mode == 'landmarks' else None
+        if boxes is None:
+            boxes = ImageRedactor.detect_faces(image, detector)
+        height, width = image.shape[:2]
+        for box in boxes:
+            (rx0, ry0, rx1, ry1), mask = ImageRedactor.face_mask(image, box, mode, gray)
+            # Never weaker than FACE_BLUR_*, stronger for large faces
+            k = max(ImageRedactor.FACE_BLUR_KERNEL, (min(rx1 - rx0, ry1 - ry0) // 2) | 1)
+            sigma = max(ImageRedactor.FACE_BLUR_SIGMA, k / 6)
+            # Blur the ROI with a kernel-radius margin of real pixels around it,
+            # as blurring the whole image would, instead of reflected borders
+            r = k // 2
+            bx0, by0 = max(rx0 - r, 0), max(ry0 - r, 0)
+            bx1, by1 = min(rx1 + r, width), min(ry1 + r, height)
+            blurred = cv2.GaussianBlur(image[by0:by1, bx0:bx1], (k, k), sigma)
+            blurred = blurred[ry0 - by0:ry1 - by0, rx0 - bx0:rx1 - bx0]
+            roi = image[ry0:ry1, rx0:rx1]
+            roi[mask == 255] = blurred[mask == 255]
+        return image
 
-            for sensitive_text, label in sensitive_items:
-                if sensitive_text in word or word in sensitive_text:
-                    x, y, w, h = data['left'][i], data['top'][i], data['width'][i], data['height'][i]
+    @staticmethod
+    def ocr(gray, digest=None, langs=None):
+        """Word-level OCR data for ``gray``; cached per image when ``digest``
+        (the SHA-256 of the source file) is given."""
+        if digest is None:
+            return OCRPipeline.image_to_data(gray, langs)
+        # OCR output does not depend on the redaction type, so it is cached per image
+        return ResultCache.default().artifact(
+            digest,
+            "ocr-" + ResultCache.text_digest(OCRPipeline.config(langs) + ":roi")[:12],
+            lambda: OCRPipeline.image_to_data(gray, langs),
+        )
 
-                    # Slightly expand redaction box
-                    pad = 2
-                    x, y = max(x - pad, 0), max(y - pad, 0)
-                    w, h = w + 2 * pad, h + 2 * pad
+    @staticmethod
+    def redact_array(image, redaction_type: str, redaction_level: int, digest=None, langs=None, pseudonyms=None,
+                     labels=None):
+        """Redact a BGR image array in place; returns it with the number of
+        regions (text boxes and faces) redacted. ``labels`` restricts the
+        patterns (default ``PATTERN_LABELS``); ``pseudonyms`` keeps synthetic
+        values consistent with the rest of a document."""
+        labels = ImageRedactor.PATTERN_LABELS if labels is None else labels
+        redacted = 0
+        pseudonyms = pseudonyms or PseudonymEngine.default().for_document()
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        with stage("image.ocr"):
+            data = ImageRedactor.ocr(gray, digest, langs)
+        index = OCRTextIndex(data)
+
+        # Each match resolves to the exact words it spans, one box per line
+        for span in PatternDetector.finditer(index.text, labels, 'image'):
+            for x, y, w, h in index.rects(span.start, span.end):
+                redacted += 1
+                # Slightly expand redaction box
+                pad = 2
+                x, y = max(x - pad, 0), max(y - pad, 0)
+                w, h = w + 2 * pad, h + 2 * pad
+
+                if redaction_type == 'black':
+                    cv2.rectangle(image, (x, y), (x + w, y + h), (0, 0, 0), -1)
+
+                elif redaction_type == 'blur':
+                    roi = image[y:y + h, x:x + w]
+                    if roi.size > 0:
+                        roi = cv2.GaussianBlur(roi, (23, 23), 30)
+                        image[y:y + h, x:x + w] = roi
+
+                elif redaction_type == 'synthetic':
+                    synthetic = pseudonyms(span.label, span.text)
+                    cv2.rectangle(image, (x, y), (x + w, y + h), (255, 255, 255), -1)
+                    cv2.putText(image, synthetic, (x, y + h - 5), cv2.FONT_HERSHEY_SIMPLEX, 0.45, (0, 0, 0), 1)
 
-                    if redaction_type == 'black':
-                        cv2.rectangle(image, (x, y), (x + w, y + h), (0, 0, 0), -1)
+        # Face redaction
+        if redaction_level >= 100:
+            with stage("image.faces"):
+                boxes = ImageRedactor.detect_faces(image)
+                image = ImageRedactor.redact_faces(image, boxes=boxes)
+            redacted += len(boxes)
+        return image, redacted
 
-                    elif redaction_type == 'blur':
-                        roi = image[y:y + h, x:x + w]
-                        if roi.size > 0:
-                            roi = cv2.GaussianBlur(roi, (23, 23), 30)
-                            image[y:y + h, x:x + w] = roi
+    @staticmethod
+    def encode_params(ext):
+        ext = ext.lower()
+        if ext in ('.jpg', '.jpeg'):
+            return [cv2.IMWRITE_JPEG_QUALITY, ImageRedactor.JPEG_QUALITY]
+        if ext == '.png':
+            return [cv2.IMWRITE_PNG_COMPRESSION, ImageRedactor.PNG_COMPRESSION]
+        return []
 
-                    elif redaction_type == 'synthetic':
-                        synthetic = ImageRedactor.generate_synthetic_data(label)
-                        cv2.rectangle(image, (x, y), (x + w, y + h), (255, 255, 255), -1)
-                        cv2.putText(image, synthetic, (x, y + h - 5), cv2.FONT_HERSHEY_SIMPLEX, 0.45, (0, 0, 0), 1)
+    @staticmethod
+    def redact_bytes(data: bytes, filename: str, redaction_type: str, redaction_level: int, digest=None, langs=None) -> bytes:
+        """Redact an encoded image held in memory and return the encoded
+        result, in the format of ``filename``, without touching the disk.
+        ``digest`` (the SHA-256 of ``data``) enables the OCR cache."""
+        ext = os.path.splitext(filename)[-1].lower()
+        with stage("image.decode"):
+            image = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+        if image is None:
+            raise ValueError(f"Could not decode image: {filename}")
+        image, _ = ImageRedactor.redact_array(image, redaction_type, redaction_level, digest=digest, langs=langs)
+        with stage("image.encode"):
+            ok, encoded = cv2.imencode(ext, image, ImageRedactor.encode_params(ext))
+        if not ok:
+            raise ValueError(f"Could not encode redacted image: {filename}")
+        return encoded.tobytes()
 
-        # Face redaction
-        if redaction_level >= 100:
-            image = ImageRedactor.redact_faces(image)
+    @staticmethod
+    def redact(file_path: str, redaction_type: str, redaction_level: int, progress=None, langs=None) -> str:
+        if progress:
+            progress(0, 1)
+        with stage("image.read"):
+            image = cv2.imread(file_path)
+        image, _ = ImageRedactor.redact_array(
+            image, redaction_type, redaction_level, digest=ResultCache.file_digest(file_path), langs=langs
+        )
 
         output_path = os.path.join(os.path.dirname(file_path), "redacted_" + os.path.basename(file_path))
-        cv2.imwrite(output_path, image)
+        with stage("image.write"):
+            cv2.imwrite(output_path, image, ImageRedactor.encode_params(os.path.splitext(output_path)[-1]))
+        if progress:
+            progress(1, 1)
         return output_path
+
+
+ModelRegistry.register("dlib:face_detector", ImageRedactor.load_face_detector)
+ModelRegistry.register("dlib:landmarks_68", ImageRedactor.load_landmark_predictor)
+if ImageRedactor.FACE_DNN_PROTO and ImageRedactor.FACE_DNN_MODEL:
+    ModelRegistry.register("opencv:face_dnn", ImageRedactor.load_face_dnn)
@@ -0,0 +1,79 @@
+import os
+import re
+from app.metrics import stage
+from app.model.Detector import Span
+from app.model.Registry import ModelRegistry
+
+
+class NERService:
+    """Shared spaCy NER: one trimmed pipeline per process, fed in batches.
+
+    Only the ``ner`` component is needed, so the parser, tagger and
+    lemmatizer are never loaded, and ``tok2vec`` is dropped when NER does not
+    listen to it. Input is split into paragraph-sized chunks and run through
+    ``nlp.pipe``; entities come back as ``Span`` objects with offsets into
+    the original text.
+    """
+
+    MODEL = os.environ.get("REDACT_SPACY_MODEL", "en_core_web_sm")
+    UNUSED_PIPES = ["parser", "tagger", "attribute_ruler", "lemmatizer", "senter", "morphologizer"]
+    BATCH_SIZE = int(os.environ.get("REDACT_NER_BATCH_SIZE", 64))
+    N_PROCESS = int(os.environ.get("REDACT_NER_PROCESSES", 1))
+    MAX_CHUNK = 10000  # characters
+
+    @staticmethod
+    def load(model):
+        import spacy  # heavy import, deferred until a model is actually needed
+
+        nlp = spacy.load(model, exclude=NERService.UNUSED_PIPES)
+        if "tok2vec" in nlp.pipe_names and not nlp.get_pipe("tok2vec").listening_components:
+            nlp.remove_pipe("tok2vec")
+        return nlp
+
+    @staticmethod
+    def nlp(model=None):
+        model = model or NERService.MODEL
+        return ModelRegistry.get(f"spacy:{model}", lambda: NERService.load(model))
+
+    @staticmethod
+    def chunks(text):
+        """Yield (offset, chunk) pieces of ``text``: paragraphs, cut at
+        whitespace when longer than ``MAX_CHUNK``."""
+        for para in re.finditer(r"\S(?:.|\n(?!\s*\n))*", text):
+            start, end = para.span()
+            while end - start > NERService.MAX_CHUNK:
+                cut = text.rfind(" ", start, start + NERService.MAX_CHUNK)
+                if cut <= start:
+                    cut = start + NERService.MAX_CHUNK
+                yield start, text[start:cut]
+                start = cut
+            if text[start:end].strip():
+                yield start, text[start:end]
+
+    @staticmethod
+    def entities_many(texts, labels=None, model=None, n_process=None):
+        """Return one list of entity ``Span`` per input text; ``n_process``
+        overrides ``N_PROCESS`` for this call."""
+        results = [[] for _ in texts]
+        items = (
+            (chunk, (i, offset))
+            for i, text in enumerate(texts)
+            for offset, chunk in NERService.chunks(text)
+        )
+        nlp = NERService.nlp(model)
+        with stage("ner"):
+            docs = nlp.pipe(
+                items, as_tuples=True, batch_size=NERService.BATCH_SIZE, n_process=n_process or NERService.N_PROCESS
+            )
+            for doc, (i, offset) in docs:
+                for ent in doc.ents:
+                    if labels is None or ent.label_ in labels:
+                        results[i].append(Span(offset + ent.start_char, offset + ent.end_char, ent.text, ent.label_))
+        return results
+
+    @staticmethod
+    def entities(text, labels=None, model=None):
+        return NERService.entities_many([text], labels, model)[0]
+
+
+ModelRegistry.register(f"spacy:{NERService.MODEL}", lambda: NERService.load(NERService.MODEL))
@@ -0,0 +1,323 @@
+import os
+import queue
+import subprocess
+import threading
+from bisect import bisect_left, bisect_right
+from concurrent.futures import ThreadPoolExecutor
+import cv2
+import pytesseract
+from app.metrics import stage
+
+# Keys of a pytesseract ``image_to_data`` dict that OCRPipeline carries over
+DATA_KEYS = ('text', 'conf', 'left', 'top', 'width', 'height', 'block_num', 'par_num', 'line_num', 'word_num')
+TSV_COLUMNS = ('level', 'page_num', 'block_num', 'par_num', 'line_num', 'word_num',
+               'left', 'top', 'width', 'height', 'conf', 'text')
+
+
+def parse_tsv(tsv):
+    """Turn Tesseract TSV output into an ``image_to_data``-style dict."""
+    data = {key: [] for key in DATA_KEYS}
+    for line in tsv.splitlines():
+        fields = line.split('\t')
+        if len(fields) < len(TSV_COLUMNS) - 1 or fields[0] == 'level':
+            continue
+        row = dict(zip(TSV_COLUMNS, fields))
+        for key in DATA_KEYS:
+            value = row.get(key, '')
+            if key == 'text':
+                data[key].append(value)
+            elif key == 'conf':
+                data[key].append(float(value))
+            else:
+                data[key].append(int(value))
+    return data
+
+
+class TesseractCLI:
+    """Runs the ``tesseract`` binary per call, handing the image over on stdin
+    and reading TSV from stdout (no temp files). At most ``concurrency``
+    processes run at once."""
+
+    name = "tesseract"
+
+    def __init__(self, concurrency):
+        self.slots = threading.BoundedSemaphore(concurrency)
+
+    def image_to_data(self, gray, langs, psm=6):
+        ok, png = cv2.imencode('.png', gray)
+        if not ok:
+            raise ValueError("Could not encode image for OCR")
+        cmd = [pytesseract.pytesseract.tesseract_cmd, 'stdin', 'stdout',
+               '--oem', '3', '--psm', str(psm), '-l', langs, 'tsv']
+        with self.slots:
+            result = subprocess.run(cmd, input=png.tobytes(), capture_output=True)
+        if result.returncode != 0:
+            raise pytesseract.TesseractError(result.returncode, result.stderr.decode('utf-8', 'replace'))
+        return parse_tsv(result.stdout.decode('utf-8', 'replace'))
+
+
+class TesserocrPool:
+    """Resident Tesseract API handles (tesserocr), reused across calls.
+
+    Each handle keeps its language data loaded; up to ``size`` handles are
+    created per language set and callers wait for a free one, which bounds
+    concurrency. tesserocr releases the GIL while recognising, so handles
+    run in parallel from threads.
+    """
+
+    name = "tesserocr"
+
+    def __init__(self, size):
+        import tesserocr
+        self.tesserocr = tesserocr
+        self.size = size
+        self.lock = threading.Lock()
+        self.handles = {}
+        self.created = {}
+
+    def acquire(self, langs, psm):
+        key = (langs, psm)
+        with self.lock:
+            handles = self.handles.setdefault(key, queue.Queue())
+        while True:
+            with self.lock:
+                try:
+                    return handles.get_nowait()
+                except queue.Empty:
+                    pass
+                create = self.created.get(key, 0) < self.size
+                if create:
+                    self.created[key] = self.created.get(key, 0) + 1
+            if create:
+                try:
+                    return self.tesserocr.PyTessBaseAPI(lang=langs, psm=psm, oem=self.tesserocr.OEM.DEFAULT)
+                except BaseException:
+                    # e.g. missing traineddata: give the slot back
+                    with self.lock:
+                        self.created[key] -= 1
+                    raise
+            try:
+                return handles.get(timeout=1)
+            except queue.Empty:
+                continue  # re-check: a failed creation frees its slot
+
+    def release(self, langs, psm, api):
+        api.Clear()
+        self.handles[(langs, psm)].put(api)
+
+    def image_to_data(self, gray, langs, psm=6):
+        api = self.acquire(langs, psm)
+        try:
+            height, width = gray.shape[:2]
+            api.SetImageBytes(gray.tobytes(), width, height, 1, width)
+            api.Recognize()
+            return parse_tsv(api.GetTSVText(0))
+        finally:
+            self.release(langs, psm, api)
+
+
+class OCRBackend:
+    """The OCR engine shared by everything in the process.
+
+    ``REDACT_OCR_BACKEND`` picks ``tesserocr`` (pooled resident handles),
+    ``tesseract`` (one CLI process per call) or ``auto`` (the former when
+    tesserocr is installed). ``REDACT_OCR_CONCURRENCY`` caps concurrent
+    recognitions either way.
+    """
+
+    KIND = os.environ.get("REDACT_OCR_BACKEND", "auto")
+    CONCURRENCY = int(os.environ.get("REDACT_OCR_CONCURRENCY", 4))
+
+    _default = None
+    _lock = threading.Lock()
+
+    @staticmethod
+    def create(kind=None, concurrency=None):
+        kind = kind or OCRBackend.KIND
+        concurrency = max(1, concurrency or OCRBackend.CONCURRENCY)
+        if kind in ("auto", "tesserocr"):
+            try:
+                return TesserocrPool(concurrency)
+            except ImportError:
+                if kind == "tesserocr":
+                    raise
+        return TesseractCLI(concurrency)
+
+    @staticmethod
+    def default():
+        with OCRBackend._lock:
+            if OCRBackend._default is None:
+                OCRBackend._default = OCRBackend.create()
+            return OCRBackend._default
+
+
+class OCRPipeline:
+    """Region-of-interest OCR for large images.
+
+    Text regions are found on a downscaled copy, then only those regions are
+    cropped from the full-resolution image and OCR'd, in parallel across a
+    thread pool sharing the process-wide ``OCRBackend``. Word boxes are
+    mapped back to full-resolution coordinates and returned in the same dict
+    shape as ``pytesseract.image_to_data``.
+    """
+
+    LANGS = os.environ.get("REDACT_OCR_LANGS", "eng+hin")
+    DETECT_MAX_SIDE = int(os.environ.get("REDACT_OCR_DETECT_SIDE", 1280))
+    THREADS = int(os.environ.get("REDACT_OCR_THREADS", 4))
+    # Above this fraction of the image covered by text, one full pass is cheaper
+    MAX_REGION_COVERAGE = 0.6
+    REGION_PAD = 8
+
+    @staticmethod
+    def config(langs=None):
+        return f"--oem 3 --psm 6 -l {langs or OCRPipeline.LANGS}"
+
+    @staticmethod
+    def preprocess(gray):
+        return cv2.bilateralFilter(gray, 11, 17, 17)
+
+    @staticmethod
+    def text_regions(gray):
+        """Bounding boxes (x, y, w, h) of text-like regions, in full-resolution
+        coordinates, detected on a copy downscaled to ``DETECT_MAX_SIDE``."""
+        height, width = gray.shape[:2]
+        scale = min(1.0, OCRPipeline.DETECT_MAX_SIDE / max(height, width))
+        small = gray if scale == 1.0 else cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+
+        # Text strokes have strong local gradients; closing joins the
+        # characters of a line into one blob
+        kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (3, 3))
+        gradient = cv2.morphologyEx(small, cv2.MORPH_GRADIENT, kernel)
+        _, binary = cv2.threshold(gradient, 0, 255, cv2.THRESH_BINARY | cv2.THRESH_OTSU)
+        connected = cv2.morphologyEx(binary, cv2.MORPH_CLOSE, cv2.getStructuringElement(cv2.MORPH_RECT, (9, 1)))
+        contours, _ = cv2.findContours(connected, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+
+        pad = OCRPipeline.REGION_PAD
+        boxes = []
+        for contour in contours:
+            x, y, w, h = cv2.boundingRect(contour)
+            if w < 8 or h < 4 or cv2.countNonZero(binary[y:y + h, x:x + w]) < 0.2 * w * h:
+                continue
+            x0 = max(int(x / scale) - pad, 0)
+            y0 = max(int(y / scale) - pad, 0)
+            x1 = min(int((x + w) / scale) + pad, width)
+            y1 = min(int((y + h) / scale) + pad, height)
+            boxes.append((x0, y0, x1 - x0, y1 - y0))
+        return OCRPipeline.merge_regions(boxes)
+
+    @staticmethod
+    def merge_regions(boxes):
+        """Fold overlapping boxes together so no word is OCR'd twice."""
+        merged = []
+        for x, y, w, h in sorted(boxes, key=lambda b: (b[1], b[0])):
+            x1, y1 = x + w, y + h
+            for i, (mx, my, mw, mh) in enumerate(merged):
+                if x < mx + mw and mx < x1 and y < my + mh and my < y1:
+                    nx, ny = min(x, mx), min(y, my)
+                    merged[i] = (nx, ny, max(x1, mx + mw) - nx, max(y1, my + mh) - ny)
+                    break
+            else:
+                merged.append((x, y, w, h))
+        if len(merged) < len(boxes):
+            return OCRPipeline.merge_regions(merged)
+        return sorted(merged, key=lambda b: (b[1], b[0]))
+
+    @staticmethod
+    def ocr(gray, langs):
+        gray = OCRPipeline.preprocess(gray)
+        with stage("ocr.tesseract"):
+            return OCRBackend.default().image_to_data(gray, langs)
+
+    @staticmethod
+    def image_to_data(gray, langs=None):
+        """OCR a grayscale image; returns word data like ``image_to_data``."""
+        langs = langs or OCRPipeline.LANGS
+        height, width = gray.shape[:2]
+        if max(height, width) <= OCRPipeline.DETECT_MAX_SIDE:
+            return OCRPipeline.ocr(gray, langs)
+
+        regions = OCRPipeline.text_regions(gray)
+        covered = sum(w * h for _, _, w, h in regions)
+        if not regions or covered > OCRPipeline.MAX_REGION_COVERAGE * width * height:
+            return OCRPipeline.ocr(gray, langs)
+
+        crops = [gray[y:y + h, x:x + w] for x, y, w, h in regions]
+        with ThreadPoolExecutor(max_workers=max(1, OCRPipeline.THREADS)) as executor:
+            results = list(executor.map(lambda crop: OCRPipeline.ocr(crop, langs), crops))
+
+        data = {key: [] for key in DATA_KEYS}
+        block_offset = 0
+        for (x, y, _, _), result in zip(regions, results):
+            for key in DATA_KEYS:
+                values = result[key]
+                if key == 'left':
+                    values = [v + x for v in values]
+                elif key == 'top':
+                    values = [v + y for v in values]
+                elif key == 'block_num':
+                    # Keep block (and so line) numbers unique across regions
+                    values = [v + block_offset for v in values]
+                data[key].extend(values)
+            block_offset += max(result['block_num'], default=0) + 1
+        return data
+
+
+class OCRTextIndex:
+    """Character-offset map over OCR words.
+
+    The non-empty words are joined into one string (a space between words,
+    a newline between lines) with each word's start offset recorded, so a
+    regex match on the text resolves by bisection to exactly the words it
+    covers, and from there to one rectangle per OCR line.
+    """
+
+    def __init__(self, data):
+        self.data = data
+        self.starts = []    # offset of each indexed word in text
+        self.ends = []      # offset just past each indexed word
+        self.words = []     # index into data of each indexed word
+        self.lines = []     # (block, paragraph, line) of each indexed word
+        parts = []
+        pos = 0
+        previous_line = None
+        for i, word in enumerate(data['text']):
+            word = word.strip()
+            if not word:
+                continue
+            line = (data['block_num'][i], data['par_num'][i], data['line_num'][i])
+            if parts:
+                separator = " " if line == previous_line else "\n"
+                parts.append(separator)
+                pos += 1
+            self.starts.append(pos)
+            self.words.append(i)
+            self.lines.append(line)
+            parts.append(word)
+            pos += len(word)
+            self.ends.append(pos)
+            previous_line = line
+        self.text = "".join(parts)
+
+    def word_range(self, start, end):
+        """Positions (into ``words``) of the words overlapping ``start:end``."""
+        first = max(bisect_right(self.starts, start) - 1, 0)
+        if first < len(self.ends) and self.ends[first] <= start:
+            first += 1  # start falls on the separator after that word
+        last = bisect_left(self.starts, end)
+        return range(first, last)
+
+    def rects(self, start, end):
+        """(x, y, w, h) per OCR line for the words overlapping ``start:end``."""
+        data = self.data
+        boxes = {}
+        for n in self.word_range(start, end):
+            i = self.words[n]
+            x0, y0 = data['left'][i], data['top'][i]
+            x1, y1 = x0 + data['width'][i], y0 + data['height'][i]
+            line = self.lines[n]
+            if line in boxes:
+                bx0, by0, bx1, by1 = boxes[line]
+                boxes[line] = (min(bx0, x0), min(by0, y0), max(bx1, x1), max(by1, y1))
+            else:
+                boxes[line] = (x0, y0, x1, y1)
+        return [(x0, y0, x1 - x0, y1 - y0) for x0, y0, x1, y1 in boxes.values()]
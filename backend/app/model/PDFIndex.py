@@ -0,0 +1,106 @@
+import re
+from collections import defaultdict
+import fitz  # PyMuPDF
+
+TOKEN_RE = re.compile(r"\w+")
+
+
+class PageTextIndex:
+    """Searchable text of one PDF page.
+
+    The page text is flattened to one whitespace-collapsed string with a
+    bbox and line id per character, plus a token -> offsets lookup. An
+    entity resolves to its exact character range through the postings of its
+    first token, and the range maps straight back to per-line rectangles,
+    so only the entity itself is redacted rather than the whole span.
+    """
+
+    def __init__(self, page_num):
+        self.page_num = page_num
+        self.raw = ""       # page text, whitespace collapsed, original case
+        self.text = ""      # same text lowercased, aligned 1:1 with raw
+        self.boxes = []     # bbox per character
+        self.line_ids = []  # line number per character
+        self.tokens = defaultdict(list)
+
+    @staticmethod
+    def normalize(text):
+        return " ".join(text.split()).lower()
+
+    @classmethod
+    def from_page(cls, page, page_num=None):
+        index = cls(page.number if page_num is None else page_num)
+        raw, boxes, line_ids = [], [], []
+        line_id = 0
+
+        for block in page.get_text("rawdict")["blocks"]:  # type: ignore[attr-defined]
+            if block["type"] != 0:
+                continue
+            for line in block["lines"]:
+                for span in line["spans"]:
+                    for char in span["chars"]:
+                        c = char["c"]
+                        if c.isspace():
+                            if not raw or raw[-1] == " ":
+                                continue
+                            c = " "
+                        raw.append(c)
+                        boxes.append(char["bbox"])
+                        line_ids.append(line_id)
+                # Lines are separated by a single space, like any other whitespace
+                if raw and raw[-1] != " ":
+                    raw.append(" ")
+                    boxes.append(None)
+                    line_ids.append(line_id)
+                line_id += 1
+
+        index.raw = "".join(raw)
+        index.text = "".join(c if len(c.lower()) != 1 else c.lower() for c in raw)
+        index.boxes = boxes
+        index.line_ids = line_ids
+        for match in TOKEN_RE.finditer(index.text):
+            index.tokens[match.group()].append(match.start())
+        return index
+
+    def find(self, entity):
+        """Yield (start, end) offsets of every occurrence of ``entity``."""
+        target = self.normalize(entity)
+        if not target:
+            return
+        first = TOKEN_RE.search(target)
+        if first is None:
+            # Punctuation-only entity: no token to anchor on, scan the text
+            start = self.text.find(target)
+            while start != -1:
+                yield start, start + len(target)
+                start = self.text.find(target, start + 1)
+            return
+        for pos in self.tokens.get(first.group(), ()):
+            start = pos - first.start()
+            if start >= 0 and self.text.startswith(target, start):
+                yield start, start + len(target)
+
+    def rects(self, start, end):
+        """Bounding rectangles of characters ``start:end``, one per text line."""
+        by_line = {}
+        for i in range(start, end):
+            box = self.boxes[i]
+            if box is None:
+                continue
+            line_id = self.line_ids[i]
+            extent = by_line.get(line_id)
+            if extent is None:
+                by_line[line_id] = list(box)
+            else:
+                extent[0] = min(extent[0], box[0])
+                extent[1] = min(extent[1], box[1])
+                extent[2] = max(extent[2], box[2])
+                extent[3] = max(extent[3], box[3])
+        return [fitz.Rect(extent) for extent in by_line.values()]
+
+    def locate(self, entity):
+        """All rectangles covering ``entity`` on this page."""
+        rects = []
+        for start, end in self.find(entity):
+            rects.extend(self.rects(start, end))
+        return rects
@@ -1,82 +1,58 @@
 import fitz  # PyMuPDF
-import spacy
+import math
 import os
-import re
-from faker import Faker
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+import cv2
+import numpy as np
+from app.cache import ResultCache
+from app.metrics import collect, merge, stage
+from app.model.NER import NERService
+from app.model.Detector import PatternDetector, Span
+from app.model.IMGRedact import ImageRedactor
+from app.model.PDFIndex import PageTextIndex
+from app.model.Pseudonyms import PseudonymEngine
 
 
 class PDFRedactor:
-    nlp = spacy.load("en_core_web_sm")  # Load once
-    fake = Faker()
+    NER_LABELS = ('PERSON', 'GPE', 'ORG', 'DATE', 'MONEY')
+    PATTERN_LABELS = ('EMAIL', 'PHONE', 'IPV4', 'IPV6')
+    # Below this many pages a document is always redacted in-process
+    PARALLEL_MIN_PAGES = int(os.environ.get("REDACT_PDF_PARALLEL_MIN_PAGES", 40))
+    # Image-only (scanned) pages are rasterized at this DPI and OCR'd on threads
+    OCR_DPI = int(os.environ.get("REDACT_PDF_OCR_DPI", 200))
+    OCR_THREADS = int(os.environ.get("REDACT_PDF_OCR_THREADS", 4))
 
     @staticmethod
-    def extract_text_and_coordinates(pdf_path):
-        doc = fitz.open(pdf_path)
-        text = ""
-        blocks = []
-
-        for page_num in range(len(doc)):
-            page = doc.load_page(page_num)
-            text += page.get_text("text")  # type: ignore[attr-defined]
-            for block in page.get_text("dict")["blocks"]:  # type: ignore[attr-defined]
-                if block['type'] == 0:
-                    for line in block["lines"]:
-                        for span in line["spans"]:
-                            blocks.append({
-                                "text": span["text"],
-                                "bbox": span["bbox"],
-                                "page_num": page_num,
-                            })
-        return text, blocks
-
-    @staticmethod
-    def extract_sensitive_data(text):
-        doc = PDFRedactor.nlp(text)
-        sensitive_data = []
-
-        for ent in doc.ents:
-            if ent.label_ in ['PERSON', 'GPE', 'ORG', 'DATE', 'MONEY']:
-                sensitive_data.append((ent.start, ent.end, ent.text, ent.label_))
-
-        patterns = {
-            'EMAIL': r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}\b',
-            'PHONE': r'\b(\+?[0-9]{1,3})?[-. ]?(\(?\d{3}\)?[-. ]?\d{3}[-. ]?\d{4})\b',
-            'IPV4': r'\b(?:[0-9]{1,3}\.){3}[0-9]{1,3}\b',
-            'IPV6': r'\b(?:[A-Fa-f0-9]{1,4}:){7}[A-Fa-f0-9]{1,4}\b',
-        }
-
-        for label, pattern in patterns.items():
-            matches = re.findall(pattern, text)
-            if label == 'PHONE':
-                for phone in matches:
-                    sensitive_data.append((0, 0, phone[1], label))  # phone[1] = number part
+    def extract_sensitive_data_many(texts):
+        """Sensitive spans of each of ``texts``, one list per text. Entities
+        depend only on the text, so they are cached per text across redaction
+        types and levels; the texts not cached go through NER in one batch."""
+        cache = ResultCache.default()
+        results = [[] for _ in texts]
+        missing = {}
+        for i, text in enumerate(texts):
+            if not text.strip():
+                continue
+            digest = ResultCache.text_digest(text)
+            cached = cache.load_artifact(digest, "pdf-entities")
+            if cached is None:
+                missing.setdefault(digest, []).append(i)
             else:
-                for match in matches:
-                    sensitive_data.append((0, 0, match, label))
+                results[i] = cached
 
-        return sensitive_data
+        if missing:
+            batch = [texts[indices[0]] for indices in missing.values()]
+            entities = NERService.entities_many(batch, PDFRedactor.NER_LABELS)
+            for (digest, indices), text, sensitive_data in zip(missing.items(), batch, entities):
+                sensitive_data.extend(PatternDetector.scan(text, PDFRedactor.PATTERN_LABELS))
+                cache.store_artifact(digest, "pdf-entities", sensitive_data)
+                for i in indices:
+                    results[i] = sensitive_data
+        return [[Span(*item) for item in spans] for spans in results]
 
     @staticmethod
-    def generate_synthetic_data(label):
-        fake = PDFRedactor.fake
-        return {
-            'EMAIL': fake.email(),
-            'PHONE': fake.phone_number(),
-            'PERSON': fake.name(),
-            'GPE': fake.city(),
-            'ORG': fake.company(),
-            'DATE': fake.date(),
-            'MONEY': fake.pricetag(),
-            'IPV4': fake.ipv4(),
-            'IPV6': fake.ipv6()
-        }.get(label, "SYNTHETIC_DATA")
-
-    @staticmethod
-    def redact(file_path: str, redaction_type: str, redaction_level: int) -> str:
-        text, blocks = PDFRedactor.extract_text_and_coordinates(file_path)
-        sensitive_data = PDFRedactor.extract_sensitive_data(text)
-        doc = fitz.open(file_path)
-
+    def entities_for_level(redaction_level):
         entities_to_redact = set()
         if redaction_level >= 25:
             entities_to_redact.update(['EMAIL', 'PHONE', 'IPV4', 'IPV6'])
@@ -86,37 +62,264 @@ class PDFRedactor:
             entities_to_redact.update(['MONEY', 'ORG', 'GPE'])
         if redaction_level == 100:
             entities_to_redact.update(['PERSON'])
+        return entities_to_redact
+
+    @staticmethod
+    def scan_labels(redaction_level):
+        """Pattern labels for the OCR'd text of scanned pages: the entities
+        of ``redaction_level`` that have a pattern, PERSON matched as NAME."""
+        entities = PDFRedactor.entities_for_level(redaction_level)
+        if 'PERSON' in entities:
+            entities = entities | {'NAME'}
+        return tuple(label for label in PatternDetector.PATTERNS if label in entities)
+
+    @staticmethod
+    def page_text(page):
+        """Plain, whitespace-collapsed text of ``page`` for detection. It needs
+        no character boxes, so it skips the ``rawdict`` extraction that the
+        redaction pass does for ``PageTextIndex``."""
+        return " ".join(page.get_text("text").split())  # type: ignore[attr-defined]
 
-        filtered_data = [d for d in sensitive_data if d[3] in entities_to_redact]
+    @staticmethod
+    def detect_pages(doc, start, stop, redaction_level, progress=None):
+        """Detection pass over pages ``start:stop``: returns ``{text: label}``
+        for every entity to redact. It runs before any page is changed, so an
+        entity first found on a later page is redacted on earlier ones too."""
+        entities_to_redact = PDFRedactor.entities_for_level(redaction_level)
+        texts = []
+        for page_num in range(start, stop):
+            with stage("pdf.extract"):
+                texts.append(PDFRedactor.page_text(doc.load_page(page_num)))
+            # The last page is reported once detection is done
+            if progress and len(texts) < stop - start:
+                progress(len(texts), stop - start)
 
-        redactions_by_page = {}
+        # One NER call for the whole range, so spaCy batches across pages
+        known = {}
+        with stage("pdf.detect"):
+            for spans in PDFRedactor.extract_sensitive_data_many(texts):
+                for _, _, sensitive_text, label in spans:
+                    if label in entities_to_redact:
+                        known.setdefault(sensitive_text, label)
+        if progress and texts:
+            progress(len(texts), stop - start)
+        return known
 
-        for _, _, sensitive_text, label in filtered_data:
-            target = sensitive_text.strip().lower()
-            for block in blocks:
-                if target in block["text"].strip().lower():
-                    page_num = block["page_num"]
-                    bbox = tuple(block["bbox"])
-                    if page_num not in redactions_by_page:
-                        redactions_by_page[page_num] = []
-                    redactions_by_page[page_num].append((bbox, label))
+    @staticmethod
+    def redact_page(page, index, redaction_type, known, pseudonyms=None):
+        """Redact every occurrence on one page of the document's entities
+        ``known`` (``{text: label}``, see ``detect_pages``). ``pseudonyms``
+        supplies synthetic values, consistent across the document.
+        """
+        pseudonyms = pseudonyms or PseudonymEngine.default().for_document()
+        items = [
+            (rect, sensitive_text, label)
+            for sensitive_text, label in known.items()
+            for rect in index.locate(sensitive_text)
+        ]
 
-        for page_num, items in redactions_by_page.items():
-            page = doc.load_page(page_num)
-            for bbox, label in items:
-                rect = fitz.Rect(*bbox)
+        with stage("pdf.apply"):
+            for rect, sensitive_text, label in items:
                 if redaction_type == 'black':
                     page.add_redact_annot(rect, fill=(0, 0, 0))
                 elif redaction_type == 'blur':
                     page.draw_rect(rect, color=(169/255, 169/255, 169/255, 0.5), fill=True)  # gray # type: ignore[attr-defined]
                 elif redaction_type == 'synthetic':
                     page.draw_rect(rect, color=(1, 1, 1), fill=True)  # white background # type: ignore[attr-defined]
-                    synthetic = PDFRedactor.generate_synthetic_data(label)
-                    page.insert_text((bbox[0], bbox[3] - 5), synthetic, fontsize=12, color=(0, 0, 0))  # black text # type: ignore[attr-defined]
+                    synthetic = pseudonyms(label, sensitive_text)
+                    page.insert_text((rect.x0, rect.y1 - 5), synthetic, fontsize=12, color=(0, 0, 0))  # black text # type: ignore[attr-defined]
 
-            if redaction_type == 'black':
+            if items and redaction_type == 'black':
                 page.apply_redactions()  # type: ignore[attr-defined]
 
+    @staticmethod
+    def is_scanned(page, index):
+        """True for pages that carry images but no extractable text."""
+        return not index.raw.strip() and bool(page.get_images())  # type: ignore[attr-defined]
+
+    @staticmethod
+    def rasterize(page):
+        with stage("pdf.rasterize"):
+            pix = page.get_pixmap(dpi=PDFRedactor.OCR_DPI, colorspace=fitz.csRGB, alpha=False)  # type: ignore[attr-defined]
+            image = np.frombuffer(pix.samples, dtype=np.uint8).reshape(pix.height, pix.width, 3)
+            return cv2.cvtColor(image, cv2.COLOR_RGB2BGR)
+
+    @staticmethod
+    def redact_scan(image, redaction_type, redaction_level, pseudonyms=None):
+        """Redact a rasterized scanned page; returns the JPEG to replace it
+        with, or None when nothing on it was redacted."""
+        # Runs on a worker thread; OCR and OpenCV release the GIL
+        image, redacted = ImageRedactor.redact_array(
+            image, redaction_type, redaction_level, pseudonyms=pseudonyms,
+            labels=PDFRedactor.scan_labels(redaction_level),
+        )
+        if not redacted:
+            return None
+        ok, encoded = cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, 90])
+        if not ok:
+            raise ValueError("Could not encode redacted page image")
+        return encoded.tobytes()
+
+    @staticmethod
+    def replace_page_image(page, image_bytes):
+        # Wipe everything on the page (the original scan included), then
+        # place the redacted raster over the full page
+        page.add_redact_annot(page.rect)  # type: ignore[attr-defined]
+        page.apply_redactions(images=fitz.PDF_REDACT_IMAGE_REMOVE)  # type: ignore[attr-defined]
+        page.insert_image(page.rect, stream=image_bytes)  # type: ignore[attr-defined]
+
+    @staticmethod
+    def redact_pages(doc, start, stop, redaction_type, redaction_level, known, progress=None):
+        # Redaction pass: each page is extracted, redacted and released before
+        # the next one is loaded. Scanned pages are rasterized here and OCR'd
+        # on a thread pool while later pages are processed.
+        pseudonyms = PseudonymEngine.default().for_document()
+        pending = {}
+        done = 0
+        window = max(1, PDFRedactor.OCR_THREADS) * 2
+
+        def finish(page_num):
+            nonlocal done
+            # Pages with nothing to redact keep their original scan
+            image_bytes = pending.pop(page_num).result()
+            if image_bytes is not None:
+                PDFRedactor.replace_page_image(doc.load_page(page_num), image_bytes)
+            done += 1
+            if progress:
+                progress(done, stop - start)
+
+        with ThreadPoolExecutor(max_workers=max(1, PDFRedactor.OCR_THREADS)) as executor:
+            for page_num in range(start, stop):
+                with stage("pdf.extract"):
+                    page = doc.load_page(page_num)
+                    index = PageTextIndex.from_page(page, page_num)
+                if PDFRedactor.is_scanned(page, index):
+                    # Bound the rasters held in memory
+                    if len(pending) >= window:
+                        finish(min(pending))
+                    pending[page_num] = executor.submit(
+                        PDFRedactor.redact_scan, PDFRedactor.rasterize(page), redaction_type, redaction_level,
+                        pseudonyms,
+                    )
+                    del page, index
+                    continue
+                PDFRedactor.redact_page(page, index, redaction_type, known, pseudonyms)
+                del page, index
+                done += 1
+                if progress:
+                    progress(done, stop - start)
+
+            for page_num in sorted(pending):
+                finish(page_num)
+
+    @staticmethod
+    def detect_range(file_path, start, stop, redaction_level):
+        """Worker entry point: entities to redact on pages ``start:stop``."""
+        with fitz.open(file_path) as doc:
+            return PDFRedactor.detect_pages(doc, start, stop, redaction_level)
+
+    @staticmethod
+    def redact_range(file_path, start, stop, redaction_type, redaction_level, output_path, known):
+        """Worker entry point: redact pages ``start:stop`` into their own PDF,
+        for the entities ``known`` detected across the whole document."""
+        doc = fitz.open(file_path)
+        PDFRedactor.redact_pages(doc, start, stop, redaction_type, redaction_level, known)
+        doc.select(list(range(start, stop)))  # type: ignore[attr-defined]
+        doc.save(output_path)
+        doc.close()
+        return output_path
+
+    @staticmethod
+    def redact_parallel(file_path, page_count, redaction_type, redaction_level, output_path, workers, progress=None):
+        # Two shards per worker keeps cores busy when pages differ in cost
+        shard = max(1, math.ceil(page_count / (workers * 2)))
+        ranges = [(start, min(start + shard, page_count)) for start in range(0, page_count, shard)]
+        # Steps: detection and redaction of each page, then merging and saving
+        total = 2 * page_count + 1
+        done = 0
+
+        with tempfile.TemporaryDirectory(dir=os.path.dirname(file_path) or None) as tmpdirname:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                # Detect on every shard first, so each shard redacts entities
+                # found anywhere in the document
+                futures = {
+                    executor.submit(collect, PDFRedactor.detect_range, (
+                        file_path, start, stop, redaction_level,
+                    )): (start, stop)
+                    for start, stop in ranges
+                }
+                found = {}
+                for future in as_completed(futures):
+                    start, stop = futures[future]
+                    found[start], samples = future.result()
+                    merge(samples)
+                    done += stop - start
+                    if progress:
+                        progress(done, total)
+                # Union in page order, as the serial detection pass builds it
+                known = {}
+                for start in sorted(found):
+                    for sensitive_text, label in found[start].items():
+                        known.setdefault(sensitive_text, label)
+
+                futures = {
+                    executor.submit(collect, PDFRedactor.redact_range, (
+                        file_path, start, stop, redaction_type, redaction_level,
+                        os.path.join(tmpdirname, f"part_{start:06d}.pdf"), known,
+                    )): (start, stop)
+                    for start, stop in ranges
+                }
+                parts = {}
+                for future in as_completed(futures):
+                    start, stop = futures[future]
+                    parts[start], samples = future.result()
+                    merge(samples)
+                    done += stop - start
+                    if progress:
+                        progress(done, total)
+
+            with stage("pdf.merge"):
+                source = fitz.open(file_path)
+                merged = fitz.open()
+                for start in sorted(parts):
+                    with fitz.open(parts[start]) as part:
+                        merged.insert_pdf(part)  # type: ignore[attr-defined]
+                merged.set_metadata(source.metadata)  # type: ignore[attr-defined]
+                merged.set_toc(source.get_toc())  # type: ignore[attr-defined]
+                source.close()
+            with stage("pdf.save"):
+                merged.save(output_path, garbage=4, deflate=True, clean=True)
+                merged.close()
+        if progress:
+            progress(total, total)
+        return output_path
+
+    @staticmethod
+    def redact(file_path: str, redaction_type: str, redaction_level: int, progress=None, workers=None) -> str:
+        """Redact a PDF, sharding pages across ``workers`` processes
+        (``REDACT_PDF_WORKERS``, default 1) once it has at least
+        ``PARALLEL_MIN_PAGES`` pages."""
+        workers = workers or int(os.environ.get("REDACT_PDF_WORKERS", 1))
         output_path = os.path.join(os.path.dirname(file_path), "redacted_" + os.path.basename(file_path))
-        doc.save(output_path, garbage=4, deflate=True, clean=True)
+        with stage("pdf.open"):
+            doc = fitz.open(file_path)
+        page_count = len(doc)
+
+        if workers > 1 and page_count >= PDFRedactor.PARALLEL_MIN_PAGES:
+            doc.close()
+            return PDFRedactor.redact_parallel(
+                file_path, page_count, redaction_type, redaction_level, output_path, workers, progress
+            )
+
+        # Steps: detection and redaction of each page, then saving
+        total = 2 * page_count + 1
+        detected = (lambda done, _: progress(done, total)) if progress else None
+        redacted = (lambda done, _: progress(page_count + done, total)) if progress else None
+        known = PDFRedactor.detect_pages(doc, 0, page_count, redaction_level, detected)
+        PDFRedactor.redact_pages(doc, 0, page_count, redaction_type, redaction_level, known, redacted)
+        with stage("pdf.save"):
+            doc.save(output_path, garbage=4, deflate=True, clean=True)
+        doc.close()
+        if progress:
+            progress(total, total)
         return output_path
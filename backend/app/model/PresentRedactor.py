@@ -1,103 +1,126 @@
-import spacy
 import os
-import re
-from faker import Faker
 from pptx import Presentation
+from pptx.shapes.group import GroupShape
+from app.metrics import stage
+from app.model.NER import NERService
+from app.model.Pseudonyms import PseudonymEngine
+from app.model.Detector import PatternDetector, LiteralMatcher
+from app.model.Spans import SpanRewriter
 
 class PresentationRedactor:
-    def __init__(self, spacy_model="en_core_web_sm"):
-        self.fake = Faker()
-        self.nlp = spacy.load(spacy_model)
+    # Decks with at least this many slides run NER in REDACT_PPTX_NER_PROCESSES processes
+    PARALLEL_MIN_SLIDES = int(os.environ.get("REDACT_PPTX_PARALLEL_MIN_SLIDES", 50))
+    NER_PROCESSES = int(os.environ.get("REDACT_PPTX_NER_PROCESSES", 1))
+
+    def __init__(self, spacy_model=None):
+        self.spacy_model = spacy_model
+
+        # Mask characters per redaction type
+        self.masks = {"black": "█", "blackout": "█", "blur": "*"}
 
         # Mapping redaction levels to sensitive types
         self.redaction_map = {
             0: [],
             25: ["ORG", "EMAIL", "PHONE"],
-            50: ["ORG", "EMAIL", "PHONE", "MONEY", "IP"],
-            75: ["ORG", "EMAIL", "PHONE", "MONEY", "IP", "DATE", "TIME"],
-            100: ["ORG", "EMAIL", "PHONE", "MONEY", "IP", "DATE", "TIME", "ADDRESS", "PERSON"]
+            50: ["ORG", "EMAIL", "PHONE", "MONEY", "IPV4"],
+            75: ["ORG", "EMAIL", "PHONE", "MONEY", "IPV4", "DATE", "TIME"],
+            100: ["ORG", "EMAIL", "PHONE", "MONEY", "IPV4", "DATE", "TIME", "ADDRESS", "PERSON"]
         }
 
-    def extract_text_from_presentation(self, ppt_path):
-        prs = Presentation(ppt_path)
-        text_blocks = []
-        text = ""
-
-        for slide in prs.slides:
-            for shape in slide.shapes:
-                if shape.has_text_frame:
-                    text_blocks.append({"text": shape.text})
-                    text += shape.text + "\n"
+    def labels_for_level(self, redact_level):
+        # Highest configured level at or below the requested one
+        levels = [level for level in self.redaction_map if level <= redact_level]
+        return self.redaction_map[max(levels)] if levels else []
 
-        return text, text_blocks
+    def iter_text_frames(self, shapes):
+        """Text frames of ``shapes``, descending into groups and tables."""
+        for shape in shapes:
+            if isinstance(shape, GroupShape):
+                yield from self.iter_text_frames(shape.shapes)
+            elif getattr(shape, "has_table", False) and shape.has_table:
+                for row in shape.table.rows:
+                    for cell in row.cells:
+                        # Cells spanned by a merge repeat the origin cell's text
+                        if not cell.is_spanned:
+                            yield cell.text_frame
+            elif shape.has_text_frame:
+                yield shape.text_frame
 
-    def detect_sensitive_data(self, text, redaction_labels):
-        doc = self.nlp(text)
-        sensitive_data = []
+    def iter_slide_paragraphs(self, slide):
+        """Run lists of every paragraph on a slide, its notes included."""
+        frames = list(self.iter_text_frames(slide.shapes))
+        if slide.has_notes_slide and slide.notes_slide.notes_text_frame is not None:
+            frames.append(slide.notes_slide.notes_text_frame)
+        for frame in frames:
+            for paragraph in frame.paragraphs:
+                if paragraph.runs:
+                    yield list(paragraph.runs)
 
-        for ent in doc.ents:
-            if ent.label_ in redaction_labels:
-                sensitive_data.append((ent.text, ent.label_))
+    def detect_sensitive_data(self, texts, redaction_labels, n_process=None):
+        """Entity ``Span`` lists, one per text, in one batched NER pass."""
+        entities = NERService.entities_many(texts, redaction_labels, self.spacy_model, n_process=n_process)
 
-        # Additional regex-based detection
-        if "MONEY" in redaction_labels:
-            money_matches = re.findall(r"\$\d+(\.\d{2})?", text)
-            sensitive_data.extend([(match, "MONEY") for match in money_matches])
-        if "TIME" in redaction_labels:
-            time_matches = re.findall(r"\b\d{1,2}:\d{2}(?:\s?[APap][Mm])?\b", text)
-            sensitive_data.extend([(match, "TIME") for match in time_matches])
-        if "IP" in redaction_labels:
-            ip_matches = re.findall(r"\b(?:\d{1,3}\.){3}\d{1,3}\b", text)
-            sensitive_data.extend([(match, "IP") for match in ip_matches])
+        # Additional regex-based detection, one pass for every pattern label
+        pattern_labels = [label for label in redaction_labels if label in PatternDetector.PATTERNS]
+        for text, spans in zip(texts, entities):
+            spans.extend(PatternDetector.scan(text, pattern_labels))
 
-        return sensitive_data
+        return entities
 
-    def generate_synthetic_data(self, label):
-        if label == "PERSON":
-            return self.fake.name()
-        elif label == "ORG":
-            return self.fake.company()
-        elif label == "EMAIL":
-            return self.fake.email()
-        elif label == "PHONE":
-            return self.fake.phone_number()
-        elif label == "MONEY":
-            return self.fake.pricetag()
-        elif label == "IP":
-            return self.fake.ipv4()
-        elif label == "DATE":
-            return self.fake.date()
-        elif label == "TIME":
-            return self.fake.time()
-        elif label == "ADDRESS":
-            return self.fake.address()
-        else:
-            return "[SYNTHETIC DATA]"
+    def redact_presentation(self, ppt_path, redact_level, redaction_type, progress=None):
+        # Single load: every text container is walked once, detection runs
+        # over all paragraphs in batches, and only affected runs are edited
+        with stage("pptx.load"):
+            prs = Presentation(ppt_path)
+            slides = [list(self.iter_slide_paragraphs(slide)) for slide in prs.slides]
+            paragraphs = [runs for slide in slides for runs in slide]
+            texts = ["".join(run.text for run in runs) for runs in paragraphs]
 
-    def redact_presentation(self, ppt_path, redact_level, redaction_type):
-        text, text_blocks = self.extract_text_from_presentation(ppt_path)
-        redaction_labels = self.redaction_map.get(redact_level, [])
+        # Steps: detection, one per slide, saving
+        total = len(slides) + 2
+        if progress:
+            progress(0, total)
+        redaction_labels = self.labels_for_level(redact_level)
+        n_process = self.NER_PROCESSES if len(slides) >= self.PARALLEL_MIN_SLIDES else 1
+        with stage("pptx.detect"):
+            found = {
+                (span.text, span.label)
+                for spans in self.detect_sensitive_data(texts, redaction_labels, n_process)
+                for span in spans
+            }
+        if progress:
+            progress(1, total)
 
-        sensitive_data = self.detect_sensitive_data(text, redaction_labels)
-
-        prs = Presentation(ppt_path)
-        for slide in prs.slides:
-            for shape in slide.shapes:
-                if shape.has_text_frame:
-                    original_text = shape.text
-                    for entity, label in sensitive_data:
-                        if entity in original_text:
-                            if redaction_type == "blackout":
-                                redacted = "█" * len(entity)
-                            elif redaction_type == "blur":
-                                redacted = "*" * len(entity)
-                            elif redaction_type == "synthetic":
-                                redacted = self.generate_synthetic_data(label)
-                            else:
-                                redacted = "[REDACTED]"
-                            original_text = re.sub(re.escape(entity), redacted, original_text)
-                    shape.text = original_text
+        # An entity found anywhere is redacted everywhere it appears
+        matcher = LiteralMatcher(found)
+        pseudonyms = PseudonymEngine.default().for_document()
+        done = 0
+        with stage("pptx.rewrite"):
+            for slide_num, slide in enumerate(slides):
+                for runs in slide:
+                    text = texts[done]
+                    done += 1
+                    spans = matcher.scan(text)
+                    if not spans:
+                        continue
+                    changed = SpanRewriter.rewrite_runs(
+                        [run.text for run in runs], spans, redaction_type,
+                        synthetic=pseudonyms,
+                        masks=self.masks,
+                        fallback="[REDACTED]",
+                    )
+                    for i, new_text in changed.items():
+                        runs[i].text = new_text
+                if progress:
+                    progress(slide_num + 2, total)
 
         redacted_ppt_path = os.path.join(os.path.dirname(ppt_path), "redacted_" + os.path.basename(ppt_path))
-        prs.save(redacted_ppt_path)
-        return redacted_ppt_path
\ No newline at end of file
+        with stage("pptx.save"):
+            prs.save(redacted_ppt_path)
+        if progress:
+            progress(total, total)
+        return redacted_ppt_path
+
+    def redact(self, file_path, redaction_type, redaction_level, progress=None):
+        """Entry point used by ``handle_file``; returns the redacted file's path."""
+        return self.redact_presentation(file_path, redaction_level, redaction_type, progress)
@@ -0,0 +1,144 @@
+import hashlib
+import hmac
+import os
+import threading
+from collections import OrderedDict, deque
+from faker import Faker
+
+# Fake value generator per entity label (spaCy and PatternDetector labels)
+GENERATORS = {
+    'PERSON': lambda fake: fake.name(),
+    'NAME': lambda fake: fake.name(),
+    'ORG': lambda fake: fake.company(),
+    'GPE': lambda fake: fake.city(),
+    'ADDRESS': lambda fake: fake.address(),
+    'EMAIL': lambda fake: fake.email(),
+    'PHONE': lambda fake: fake.phone_number(),
+    'DATE': lambda fake: fake.date(),
+    'TIME': lambda fake: fake.time(),
+    'MONEY': lambda fake: fake.pricetag(),
+    'IPV4': lambda fake: fake.ipv4(),
+    'IPV6': lambda fake: fake.ipv6(),
+    'AADHAAR': lambda fake: fake.bothify(text='#### #### ####'),
+    'PAN': lambda fake: fake.bothify(text='?????####?'),
+}
+FALLBACK = "SYNTHETIC_DATA"
+
+
+class PseudonymEngine:
+    """Process-wide source of synthetic replacement values.
+
+    Values are pre-generated into one pool per label and topped up by a
+    background thread, so redaction loops only pop from a deque instead of
+    calling Faker. ``for_document`` hands out a ``Pseudonymizer`` that maps
+    each real value to one stable replacement.
+
+    With ``REDACT_PSEUDONYM_KEY`` set, replacements are derived from an HMAC
+    of (tenant, label, value) instead, so a value gets the same pseudonym in
+    every document of a tenant; those are served from an in-memory LRU.
+    """
+
+    POOL_SIZE = int(os.environ.get("REDACT_PSEUDONYM_POOL", 512))
+    LRU_SIZE = int(os.environ.get("REDACT_PSEUDONYM_LRU", 100000))
+    KEY = os.environ.get("REDACT_PSEUDONYM_KEY", "")
+    TENANT = os.environ.get("REDACT_PSEUDONYM_TENANT", "")
+
+    _default = None
+    _default_lock = threading.Lock()
+
+    def __init__(self, pool_size=None, lru_size=None, key=None):
+        self.pool_size = pool_size or PseudonymEngine.POOL_SIZE
+        self.lru_size = lru_size or PseudonymEngine.LRU_SIZE
+        self.key = (PseudonymEngine.KEY if key is None else key).encode()
+        self.pools = {label: deque() for label in GENERATORS}
+        self.fake = Faker()          # used by the refill thread only
+        self.inline_fake = Faker()   # pool ran dry: generate on the caller's thread
+        self.seeded_fake = Faker()   # keyed mode
+        self.lock = threading.Lock()
+        self.lru = OrderedDict()
+        self.wanted = threading.Event()
+        self.refiller = None
+
+    @classmethod
+    def default(cls):
+        """The engine shared by everything in this process."""
+        with cls._default_lock:
+            if cls._default is None:
+                cls._default = cls()
+            return cls._default
+
+    def _ensure_refiller(self):
+        # Threads do not survive a fork into a worker process, so check each time
+        if self.refiller is None or not self.refiller.is_alive():
+            self.refiller = threading.Thread(target=self._refill_forever, name="pseudonym-refill", daemon=True)
+            self.refiller.start()
+
+    def _refill_forever(self):
+        while True:
+            self.wanted.wait()
+            self.wanted.clear()
+            for label, pool in self.pools.items():
+                while len(pool) < self.pool_size:
+                    pool.append(GENERATORS[label](self.fake))
+
+    def take(self, label):
+        """A fresh synthetic value for ``label``."""
+        generator = GENERATORS.get(label)
+        if generator is None:
+            return FALLBACK
+        pool = self.pools[label]
+        if len(pool) < self.pool_size // 2:
+            self._ensure_refiller()
+            self.wanted.set()
+        try:
+            return pool.popleft()
+        except IndexError:
+            with self.lock:
+                return generator(self.inline_fake)
+
+    def keyed(self, label, value, tenant=""):
+        """The stable pseudonym of ``value`` for ``tenant`` (keyed mode)."""
+        generator = GENERATORS.get(label)
+        if generator is None:
+            return FALLBACK
+        message = "\x1f".join((tenant, label, " ".join(value.split()).lower())).encode()
+        digest = hmac.new(self.key, message, hashlib.sha256).digest()
+        with self.lock:
+            cached = self.lru.get(digest)
+            if cached is not None:
+                self.lru.move_to_end(digest)
+                return cached
+            self.seeded_fake.seed_instance(int.from_bytes(digest[:8], "big"))
+            pseudonym = generator(self.seeded_fake)
+            self.lru[digest] = pseudonym
+            if len(self.lru) > self.lru_size:
+                self.lru.popitem(last=False)
+            return pseudonym
+
+    def for_document(self, tenant=None):
+        return Pseudonymizer(self, PseudonymEngine.TENANT if tenant is None else tenant)
+
+
+class Pseudonymizer:
+    """Replacement mapping for one document: ``pseudonymizer(label, value)``
+    always returns the same fake value for the same real one. Usable as the
+    ``synthetic`` callback of ``SpanRewriter``. Thread-safe: the OCR threads
+    of a scanned PDF share one."""
+
+    def __init__(self, engine, tenant=""):
+        self.engine = engine
+        self.tenant = tenant
+        self.mapping = {}
+        self.lock = threading.Lock()
+
+    def __call__(self, label, value):
+        key = (label, " ".join(value.split()).lower())
+        with self.lock:
+            pseudonym = self.mapping.get(key)
+            if pseudonym is None:
+                if self.engine.key:
+                    pseudonym = self.engine.keyed(label, value, self.tenant)
+                else:
+                    pseudonym = self.engine.take(label)
+                self.mapping[key] = pseudonym
+            return pseudonym
@@ -0,0 +1,70 @@
+import os
+import threading
+import time
+
+
+def _rss_bytes():
+    """Current resident set size of this process, or None if unknown."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class ModelRegistry:
+    """Process-wide registry of heavy models, each loaded on first use.
+
+    Redactors ask for a model by name instead of loading it at import time,
+    so a CSV job never pays for spaCy or dlib, and every redactor in the
+    process shares the same instance. Load time and resident-memory growth
+    are recorded per model.
+    """
+
+    _loaders = {}
+    _models = {}
+    _stats = {}
+    _lock = threading.RLock()
+
+    @staticmethod
+    def register(name, loader):
+        with ModelRegistry._lock:
+            ModelRegistry._loaders.setdefault(name, loader)
+
+    @staticmethod
+    def get(name, loader=None):
+        model = ModelRegistry._models.get(name)
+        if model is not None:
+            return model
+        with ModelRegistry._lock:
+            if name not in ModelRegistry._models:
+                if loader is not None:
+                    ModelRegistry.register(name, loader)
+                if name not in ModelRegistry._loaders:
+                    raise KeyError(f"Unknown model: {name}")
+                rss_before = _rss_bytes()
+                start = time.perf_counter()
+                ModelRegistry._models[name] = ModelRegistry._loaders[name]()
+                rss_after = _rss_bytes()
+                ModelRegistry._stats[name] = {
+                    "load_seconds": round(time.perf_counter() - start, 3),
+                    "rss_delta_mb": (
+                        round((rss_after - rss_before) / 2**20, 1)
+                        if rss_before is not None and rss_after is not None else None
+                    ),
+                }
+            return ModelRegistry._models[name]
+
+    @staticmethod
+    def warm_up(names=None):
+        """Load ``names`` (default: every registered model) now."""
+        for name in names or list(ModelRegistry._loaders):
+            ModelRegistry.get(name)
+
+    @staticmethod
+    def stats():
+        with ModelRegistry._lock:
+            return {
+                name: {"loaded": name in ModelRegistry._models, **ModelRegistry._stats.get(name, {})}
+                for name in ModelRegistry._loaders
+            }
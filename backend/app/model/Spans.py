@@ -0,0 +1,96 @@
+from bisect import bisect_right
+from app.model.Detector import Span
+
+
+class SpanRewriter:
+    # Character used to mask each redacted character, per redaction type
+    MASKS = {'black': '█', 'blackout': '█', 'blur': '-'}
+
+    @staticmethod
+    def merge(spans):
+        """Sort spans and fold overlapping ones together.
+
+        A merged span keeps the label of the span that starts first (the
+        longest one on ties), so each character is redacted exactly once.
+        """
+        merged = []
+        for start, end, text, label in sorted(spans, key=lambda s: (s[0], -s[1])):
+            if merged and start < merged[-1].end:
+                last = merged[-1]
+                if end > last.end:
+                    merged[-1] = Span(last.start, end, None, last.label)
+                continue
+            merged.append(Span(start, end, text, label))
+        return merged
+
+    @staticmethod
+    def replacement(text, label, redaction_type, synthetic=None, masks=None, fallback=None):
+        if redaction_type == 'synthetic' and synthetic is not None:
+            return synthetic(label, text)
+        symbol = (masks or SpanRewriter.MASKS).get(redaction_type)
+        if symbol is None:
+            return text if fallback is None else fallback
+        return symbol * len(text)
+
+    @staticmethod
+    def rewrite(text, spans, redaction_type, synthetic=None, masks=None, fallback=None):
+        """Return ``text`` with every span redacted, in a single pass.
+
+        ``spans`` are (start, end, text, label) offsets into ``text`` and may
+        overlap. ``synthetic(label, original)`` supplies replacement values in
+        synthetic mode; ``masks`` overrides the per-type mask characters and
+        ``fallback`` replaces spans for unknown redaction types.
+        """
+        if not spans:
+            return text
+        parts = []
+        pos = 0
+        for start, end, _, label in SpanRewriter.merge(spans):
+            parts.append(text[pos:start])
+            parts.append(SpanRewriter.replacement(
+                text[start:end], label, redaction_type, synthetic, masks, fallback
+            ))
+            pos = end
+        parts.append(text[pos:])
+        return "".join(parts)
+
+    @staticmethod
+    def rewrite_runs(texts, spans, redaction_type, synthetic=None, masks=None, fallback=None):
+        """Redact text split across formatting runs, touching only the runs a
+        span overlaps.
+
+        ``texts`` are the run texts in order and ``spans`` offsets into their
+        concatenation. Returns ``{run index: new text}`` for the runs that
+        change. A replacement as long as the original (a mask) is split
+        across the runs it covers, so each character keeps its formatting;
+        any other replacement goes into the run the span starts in and the
+        rest of the span is removed from the following runs.
+        """
+        starts = []
+        pos = 0
+        for text in texts:
+            starts.append(pos)
+            pos += len(text)
+        full = "".join(texts)
+
+        changed = {}
+        # Right to left, so offsets of earlier spans in the same run stay valid
+        for start, end, _, label in reversed(SpanRewriter.merge(spans)):
+            replacement = SpanRewriter.replacement(
+                full[start:end], label, redaction_type, synthetic, masks, fallback
+            )
+            same_length = len(replacement) == end - start
+            i = max(bisect_right(starts, start) - 1, 0)
+            while i < len(texts) and starts[i] < end:
+                run_start = starts[i]
+                a, b = max(start, run_start), min(end, run_start + len(texts[i]))
+                if a < b:
+                    if same_length:
+                        piece = replacement[a - start:b - start]
+                    else:
+                        piece = replacement if a == start else ""
+                    text = changed.get(i, texts[i])
+                    changed[i] = text[:a - run_start] + piece + text[b - run_start:]
+                i += 1
+        return changed
+
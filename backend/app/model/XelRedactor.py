@@ -1,73 +1,184 @@
 import os
-import re
 import pandas as pd
+from pandas.api.types import infer_dtype, is_object_dtype, is_string_dtype
+from openpyxl import Workbook, load_workbook
+from app.metrics import stage
+from app.model.Detector import PatternDetector
+from app.model.Spans import SpanRewriter
+
+CHUNK_ROWS = 10000
+
+
+def stream_lines(input_file, output_file, redact, progress=None):
+    """Redacts a text file line by line."""
+    with open(input_file, 'r') as src, open(output_file, 'w') as dst:
+        for line_num, line in enumerate(src, 1):
+            dst.write(redact(line.rstrip('\r\n')) + '\n')
+            if progress and line_num % CHUNK_ROWS == 0:
+                progress(line_num, None)
+
+
+def stream_csv(input_file, output_file, redact_frame, progress=None):
+    """Redacts a CSV file in chunks of ``CHUNK_ROWS`` rows."""
+    rows = 0
+    with open(output_file, 'w', newline='') as dst:
+        for chunk_num, chunk in enumerate(pd.read_csv(input_file, chunksize=CHUNK_ROWS)):
+            redact_frame(chunk).to_csv(dst, header=chunk_num == 0, index=False)
+            rows += len(chunk)
+            if progress:
+                progress(rows, None)
+
+
+def stream_xlsx(input_file, output_file, redact_frame, progress=None):
+    """Redacts every sheet of a workbook, reading and writing rows in
+    chunks of ``CHUNK_ROWS`` through openpyxl's read-only/write-only modes.
+    The first row of each sheet is the header and is copied unchanged."""
+    src = load_workbook(input_file, read_only=True)
+    dst = Workbook(write_only=True)
+    rows = 0
+    try:
+        for sheet in src.worksheets:
+            out = dst.create_sheet(sheet.title)
+            values = sheet.iter_rows(values_only=True)
+            header = next(values, None)
+            if header is None:
+                continue
+            out.append(header)
+
+            chunk = []
+            for row in values:
+                chunk.append(row)
+                if len(chunk) == CHUNK_ROWS:
+                    _write_xlsx_chunk(out, chunk, header, redact_frame)
+                    rows += len(chunk)
+                    chunk = []
+                    if progress:
+                        progress(rows, None)
+            if chunk:
+                _write_xlsx_chunk(out, chunk, header, redact_frame)
+                rows += len(chunk)
+        with stage("xlsx.save"):
+            dst.save(output_file)
+    finally:
+        src.close()
+
+
+def _write_xlsx_chunk(out, chunk, header, redact_frame):
+    width = max([len(header)] + [len(row) for row in chunk])
+    # Header names label the columns; blank or repeated ones fall back to the position
+    names = []
+    for i in range(width):
+        name = header[i] if i < len(header) else None
+        names.append(name if name is not None and name not in names else f"column_{i}")
+    df = pd.DataFrame([tuple(row) + (None,) * (width - len(row)) for row in chunk], columns=names, dtype=object)
+    for row in redact_frame(df).itertuples(index=False, name=None):
+        out.append([None if isinstance(value, float) and pd.isna(value) else value for value in row])
+
+
+def _holds_strings(col):
+    # Object columns (e.g. XLSX rows) may hold only numbers, dates or nothing
+    if is_object_dtype(col):
+        return infer_dtype(col, skipna=True) in ('string', 'mixed', 'mixed-integer')
+    return is_string_dtype(col)
+
+
+def redact_columns(df, labels, redaction_type, always_redact=(), never_redact=(), pattern_set='file'):
+    """Redacts a DataFrame chunk column by column.
+
+    Each string column is rewritten by one vectorized ``str.replace`` over the
+    combined pattern for ``labels``; numeric and other non-string columns are
+    skipped. Columns named in ``always_redact`` are masked whole and those in
+    ``never_redact`` kept as they are, both without running detection.
+    ``pattern_set`` selects the PatternDetector variant. One match is
+    replaced per position, so a match overlapping an earlier one of another
+    label is not redacted separately.
+    """
+    regex = PatternDetector.compile(frozenset(labels), pattern_set)
+    symbol = SpanRewriter.MASKS.get(redaction_type, SpanRewriter.MASKS['black'])
+
+    def replace(match):
+        return SpanRewriter.replacement(match.group(), match.lastgroup, redaction_type)
+
+    df = df.copy()
+    with stage("table.redact"):
+        for i, name in enumerate(df.columns):
+            col = df.iloc[:, i]
+            if name in never_redact:
+                continue
+            if name in always_redact:
+                masked = col.astype(str).str.replace(r'(?s).', symbol, regex=True)
+            elif regex is not None and _holds_strings(col):
+                # Non-string cells of mixed columns come back as NaN and are restored below
+                masked = col.str.replace(regex, replace, regex=True)
+            else:
+                continue
+            df.isetitem(i, masked.where(col.notna() & masked.notna(), col))
+    return df
+
 
 class FileRedactor:
-    def __init__(self):
-        # Define patterns for sensitive information and their corresponding redaction thresholds
+    def __init__(self, always_redact=(), never_redact=()):
+        # Tabular columns masked whole / left untouched, skipping detection
+        self.always_redact = frozenset(always_redact)
+        self.never_redact = frozenset(never_redact)
+        # Labels of sensitive information (see PatternDetector) and their redaction thresholds
         self.redaction_map = {
-            25: [(r'\b(?:\d{1,3}\.){3}\d{1,3}\b', "IP")],
-            50: [(r'\b\d{4}-\d{2}-\d{2}\b', "DATE"), (r'\b\d{2}:\d{2}:\d{2}\b', "TIME")],
-            75: [(r'\bTCP\b|\bUDP\b', "PROTOCOL")],
-            100: [(r'\b[a-zA-Z0-9.-]+\\.com\b', "HOSTNAME")]
+            25: ["IPV4"],
+            50: ["DATE", "TIME"],
+            75: ["PROTOCOL"],
+            100: ["HOSTNAME"]
         }
 
-    def redact_text(self, text, symbol="█"):
-        """Redacts text with a given symbol."""
-        return symbol * len(text)
+    def labels_for(self, redaction_scale):
+        return [
+            label
+            for threshold, names in self.redaction_map.items() if redaction_scale >= threshold
+            for label in names
+        ]
 
     def redact_line(self, line, redaction_scale, option):
         """Redacts sensitive information in a single line based on the redaction scale."""
-        for threshold, patterns in self.redaction_map.items():
-            if redaction_scale >= threshold:
-                for pattern, label in patterns:
-                    matches = re.finditer(pattern, line)
-                    for match in matches:
-                        redacted = (
-                            self.redact_text(match.group()) if option.lower() != 'blur' else self.redact_text(match.group(), "-")
-                        )
-                        line = line.replace(match.group(), redacted)
-        return line
-
-    def redact_file(self, input_file, output_file, redaction_scale, option):
-        """Handles file redaction for .txt, .csv, and .xlsx formats."""
+        spans = PatternDetector.scan(line, self.labels_for(redaction_scale), 'file')
+        return SpanRewriter.rewrite(line, spans, 'blur' if option.lower() == 'blur' else 'black')
+
+    def redact_frame(self, df, redaction_scale, option):
+        """Redacts the string columns of a DataFrame chunk."""
+        return redact_columns(
+            df,
+            self.labels_for(redaction_scale),
+            'blur' if option.lower() == 'blur' else 'black',
+            self.always_redact,
+            self.never_redact,
+        )
+
+    def redact_file(self, input_file, output_file, redaction_scale, option, progress=None):
+        """Handles file redaction for .txt, .csv, and .xlsx formats.
+
+        Files are streamed (lines, CSV chunks, read-only XLSX rows) and written
+        incrementally, so memory use does not grow with the file size.
+        """
         file_extension = input_file.split('.')[-1].lower()
 
         if file_extension == 'txt':
-            with open(input_file, 'r') as f:
-                lines = f.readlines()
-
-            redacted_lines = [self.redact_line(line.strip(), redaction_scale, option) for line in lines]
-
-            with open(output_file, 'w') as f:
-                for redacted_line in redacted_lines:
-                    f.write(redacted_line + '\n')
+            stream_lines(input_file, output_file, lambda line: self.redact_line(line, redaction_scale, option), progress)
 
         elif file_extension == 'csv':
-            df = pd.read_csv(input_file)
-            redacted_df = df.apply(
-                lambda row: row.apply(
-                    lambda x: self.redact_line(str(x), redaction_scale, option) if isinstance(x, str) else x
-                ),
-                axis=1
-            )
-            redacted_df.to_csv(output_file, index=False)
+            stream_csv(input_file, output_file, lambda df: self.redact_frame(df, redaction_scale, option), progress)
 
         elif file_extension == 'xlsx':
-            df = pd.read_excel(input_file)
-            redacted_df = df.apply(
-                lambda row: row.apply(
-                    lambda x: self.redact_line(str(x), redaction_scale, option) if isinstance(x, str) else x
-                ),
-                axis=1
-            )
-            redacted_df.to_excel(output_file, index=False)
+            stream_xlsx(input_file, output_file, lambda df: self.redact_frame(df, redaction_scale, option), progress)
 
         else:
             print(f"Unsupported file format: {file_extension}")
             return
 
-        print(f"Redacted file saved as {output_file}")
+        return output_file
+
+    def redact(self, file_path, redaction_type, redaction_level, progress=None):
+        """Entry point used by ``handle_file``; returns the redacted file's path."""
+        option = 'blur' if redaction_type == 'blur' else 'blackout'
+        output_path = os.path.join(os.path.dirname(file_path), "redacted_" + os.path.basename(file_path))
+        return self.redact_file(file_path, output_path, redaction_level, option, progress)
 
     def process_redaction(self, input_file, output_file, redaction_scale, option):
         """Wrapper method to validate inputs and execute redaction."""
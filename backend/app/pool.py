@@ -0,0 +1,160 @@
+# backend/app/pool.py
+import asyncio
+import os
+import threading
+from concurrent.futures import Future, InvalidStateError, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from app import metrics
+from app.model.Registry import ModelRegistry
+
+
+class PoolFull(Exception):
+    """Raised when the pending-job queue is at capacity."""
+
+    def __init__(self, retry_after):
+        super().__init__("Redaction queue is full")
+        self.retry_after = retry_after
+
+
+def _execute(fn, args, profile_path):
+    """Worker entry point: ``metrics.collect`` plus this worker's pid and
+    model stats, which the API process reports under ``/models``."""
+    try:
+        result, samples = metrics.collect(fn, args, profile_path)
+    except BaseException as exc:
+        exc.worker_models = (os.getpid(), ModelRegistry.stats())
+        raise
+    return result, samples, (os.getpid(), ModelRegistry.stats())
+
+
+class RedactionPool:
+    """Process pool with a bounded queue and per-job timeouts.
+
+    Redaction is CPU bound (spaCy, Tesseract, dlib, PyMuPDF), so jobs run in
+    worker processes instead of on the event loop. ``max_pending`` caps the
+    number of jobs that are running or waiting; beyond that ``submit`` raises
+    ``PoolFull`` so the API can answer 429 instead of queueing without bound.
+    """
+
+    def __init__(self, workers=None, max_pending=None, timeout=None, retry_after=None,
+                 initializer=None, initargs=()):
+        self.workers = workers or int(os.environ.get("REDACT_WORKERS", os.cpu_count() or 1))
+        self.max_pending = max_pending or int(os.environ.get("REDACT_MAX_PENDING", self.workers * 4))
+        self.timeout = timeout or float(os.environ.get("REDACT_JOB_TIMEOUT", 300))
+        self.retry_after = retry_after or int(os.environ.get("REDACT_RETRY_AFTER", 5))
+        self.initializer = initializer
+        self.initargs = initargs
+        self._executor = None
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._worker_models = {}
+
+    @property
+    def pending(self):
+        return self._pending
+
+    def worker_models(self):
+        """Model stats of each worker process, as of its last finished job."""
+        with self._lock:
+            return {str(pid): stats for pid, stats in sorted(self._worker_models.items())}
+
+    def _record(self, worker):
+        if worker is not None:
+            pid, stats = worker
+            with self._lock:
+                self._worker_models[pid] = stats
+
+    def _release(self, _future):
+        with self._lock:
+            self._pending -= 1
+
+    def _discard(self, executor):
+        # A worker died (OOM, crash in native code): the executor refuses any
+        # further work, so drop it and let the next submit start a fresh one
+        with self._lock:
+            if self._executor is not executor:
+                return
+            self._executor = None
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def submit(self, fn, *args, profile_path=None):
+        """Schedule ``fn(*args)`` in a worker process and return its future.
+
+        Stage timings recorded in the worker are merged into this process's
+        metrics and its model stats recorded when the job ends;
+        ``profile_path`` dumps a cProfile of the job.
+        """
+        with self._lock:
+            if self._pending >= self.max_pending:
+                raise PoolFull(self.retry_after)
+            self._pending += 1
+        try:
+            # A broken executor is replaced once; a fresh one failing is real
+            for attempt in range(2):
+                executor = self._current()
+                try:
+                    inner = executor.submit(_execute, fn, args, profile_path)
+                    break
+                except BrokenProcessPool:
+                    self._discard(executor)
+                    if attempt:
+                        raise
+        except Exception:
+            self._release(None)
+            raise
+        inner.add_done_callback(self._release)
+
+        future = Future()
+        future.add_done_callback(lambda f: f.cancelled() and inner.cancel())
+        inner.add_done_callback(lambda f: self._relay(f, future, executor))
+        return future
+
+    def _current(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers, initializer=self.initializer, initargs=self.initargs
+                )
+            return self._executor
+
+    def _relay(self, inner, future, executor=None):
+        try:
+            if inner.cancelled():
+                future.cancel()
+                return
+            exc = inner.exception()
+            if isinstance(exc, BrokenProcessPool) and executor is not None:
+                self._discard(executor)
+            if exc is not None:
+                metrics.merge(getattr(exc, "stage_samples", ()))
+                self._record(getattr(exc, "worker_models", None))
+                future.set_exception(exc)
+            else:
+                result, samples, worker = inner.result()
+                metrics.merge(samples)
+                self._record(worker)
+                future.set_result(result)
+        except InvalidStateError:
+            pass  # the caller gave up on it (timeout)
+
+    async def run(self, fn, *args, profile_path=None):
+        """Run ``fn(*args)`` in the pool and await its result.
+
+        Raises ``PoolFull`` when the queue is at capacity and
+        ``asyncio.TimeoutError`` when the job exceeds ``timeout`` seconds. A job
+        that already started cannot be interrupted; it keeps its slot until it
+        finishes so backpressure still reflects the real load.
+        """
+        future = self.submit(fn, *args, profile_path=profile_path)
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), self.timeout)
+        except asyncio.TimeoutError:
+            future.cancel()
+            raise
+
+    def shutdown(self):
+        with self._lock:
+            executor, self._executor = self._executor, None
+            self._worker_models.clear()
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
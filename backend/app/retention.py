@@ -0,0 +1,81 @@
+# backend/app/retention.py
+import os
+import shutil
+import time
+
+
+class RetentionPolicy:
+    """Deletes persisted per-request entries (result and job directories,
+    profile dumps) that are older than ``ttl`` seconds, then the oldest
+    remaining ones while the total size is above ``max_bytes``.
+
+    Entries younger than ``grace`` seconds are never removed for size, so
+    work that is still being written or downloaded is left alone.
+    """
+
+    def __init__(self, ttl=None, max_bytes=None, grace=60):
+        self.ttl = ttl if ttl is not None else float(os.environ.get("REDACT_RETENTION_TTL", 3600))
+        if max_bytes is None:
+            max_bytes = int(float(os.environ.get("REDACT_RETENTION_MAX_MB", 2048)) * 2**20)
+        self.max_bytes = max_bytes
+        self.grace = grace
+
+    @staticmethod
+    def _size(path):
+        if not os.path.isdir(path):
+            try:
+                return os.path.getsize(path)
+            except OSError:
+                return 0
+        total = 0
+        for dirpath, _, filenames in os.walk(path):
+            for name in filenames:
+                try:
+                    total += os.path.getsize(os.path.join(dirpath, name))
+                except OSError:
+                    pass
+        return total
+
+    def prune(self, root):
+        """Apply the policy to the entries directly under ``root``; returns
+        the number of entries removed."""
+        try:
+            names = os.listdir(root)
+        except FileNotFoundError:
+            return 0
+
+        now = time.time()
+        entries = []
+        removed = 0
+        for name in names:
+            path = os.path.join(root, name)
+            try:
+                mtime = os.path.getmtime(path)
+            except OSError:
+                continue
+            if now - mtime > self.ttl:
+                self._remove(path)
+                removed += 1
+            else:
+                entries.append((mtime, self._size(path), path))
+
+        total = sum(size for _, size, _ in entries)
+        for mtime, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if now - mtime < self.grace:
+                continue
+            self._remove(path)
+            removed += 1
+            total -= size
+        return removed
+
+    @staticmethod
+    def _remove(path):
+        if os.path.isdir(path):
+            shutil.rmtree(path, ignore_errors=True)
+        else:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
@@ -0,0 +1,55 @@
+# backend/app/uploads.py
+import hashlib
+import os
+from typing import Annotated, Literal
+from fastapi import Form
+from pydantic import AfterValidator
+from app.cache import ResultCache
+
+# Uploads up to this size are read into memory (small images are then
+# redacted without touching the disk); larger ones are copied to disk.
+SPOOL_MAX_BYTES = int(float(os.environ.get("REDACT_SPOOL_MAX_MB", 4)) * 2**20)
+
+LEVELS = (25, 50, 75, 100)
+
+
+def _check_level(value):
+    if value not in LEVELS:
+        raise ValueError("Input should be 25, 50, 75 or 100")
+    return value
+
+
+# Form fields shared by the upload endpoints
+RedactionType = Annotated[Literal["black", "blur", "synthetic"], Form()]
+RedactionLevel = Annotated[int, AfterValidator(_check_level), Form()]
+
+
+def filename(upload):
+    """The client's file name, reduced to its last path component."""
+    return os.path.basename(upload.filename or "") or "uploaded_file"
+
+
+def unique_path(dest_dir, name):
+    """``dest_dir/name``, numbered when a file of that name already exists."""
+    path = os.path.join(dest_dir, name)
+    stem, ext = os.path.splitext(name)
+    n = 1
+    while os.path.exists(path):
+        path = os.path.join(dest_dir, f"{stem}_{n}{ext}")
+        n += 1
+    return path
+
+
+def save(upload, dest_dir):
+    """Copy ``upload`` into ``dest_dir`` in chunks, hashing it on the way;
+    returns ``(path, digest)``. Blocking, run it in a thread."""
+    path = unique_path(dest_dir, filename(upload))
+    upload.file.seek(0)
+    return path, ResultCache.write_hashed(upload.file, path)
+
+
+def read(upload):
+    """``(data, digest)`` of a small upload, read into memory. Blocking."""
+    upload.file.seek(0)
+    data = upload.file.read()
+    return data, hashlib.sha256(data).hexdigest()
@@ -0,0 +1,198 @@
+# backend/benchmarks/corpus.py
+"""Synthetic, reproducible documents for every format the backend redacts.
+
+Each generator writes ``units`` pages / paragraphs / slides / rows (or an
+image ``units`` pixels wide) in which roughly ``density`` of the lines carry
+PII (names, emails, phones, IPs, dates, money). The same seed always gives
+the same files.
+
+    python -m benchmarks.corpus OUT_DIR --formats pdf,docx --units 20 --density 0.3
+"""
+import argparse
+import csv
+import os
+import random
+import cv2
+import fitz  # PyMuPDF
+import numpy as np
+from docx import Document
+from faker import Faker
+from openpyxl import Workbook
+from pptx import Presentation
+from pptx.util import Inches
+
+FORMATS = ("pdf", "docx", "pptx", "csv", "xlsx", "txt", "png", "jpg")
+
+
+class LineMaker:
+    """Lines of prose, a share of which mention PII."""
+
+    def __init__(self, density, seed):
+        self.density = density
+        self.fake = Faker()
+        self.fake.seed_instance(seed)
+        self.random = random.Random(seed)
+
+    def pii(self):
+        fake = self.fake
+        return self.random.choice((
+            lambda: f"Contact {fake.name()} at {fake.email()}",
+            lambda: f"Call {fake.phone_number()} before {fake.date()}",
+            lambda: f"{fake.company()} wired {fake.pricetag()} from {fake.ipv4()}",
+            lambda: f"{fake.name()} moved to {fake.city()} on {fake.date()}",
+        ))()
+
+    def line(self):
+        if self.random.random() < self.density:
+            return f"{self.fake.sentence(nb_words=6)} {self.pii()}."
+        return self.fake.sentence(nb_words=14)
+
+
+def make_pdf(path, units, lines):
+    doc = fitz.open()
+    for _ in range(units):
+        page = doc.new_page()
+        y = 50
+        for _ in range(40):
+            page.insert_text((40, y), lines.line(), fontsize=9)  # type: ignore[attr-defined]
+            y += 18
+    doc.save(path)
+    doc.close()
+
+
+def make_docx(path, units, lines):
+    doc = Document()
+    for i in range(units):
+        paragraph = doc.add_paragraph()
+        # Alternate formatting so entities straddle runs
+        for j, word in enumerate(lines.line().split(" ")):
+            run = paragraph.add_run(word + " ")
+            run.bold = (i + j) % 7 == 0
+        if i % 25 == 24:
+            table = doc.add_table(rows=2, cols=2)
+            for cell in table._cells:
+                cell.text = lines.line()
+    doc.sections[0].header.paragraphs[0].text = lines.line()
+    doc.save(path)
+
+
+def make_pptx(path, units, lines):
+    prs = Presentation()
+    for _ in range(units):
+        slide = prs.slides.add_slide(prs.slide_layouts[5])
+        slide.shapes.title.text = lines.line()
+        box = slide.shapes.add_textbox(Inches(0.5), Inches(1.5), Inches(9), Inches(4))
+        box.text_frame.text = "\n".join(lines.line() for _ in range(6))
+        table = slide.shapes.add_table(2, 2, Inches(0.5), Inches(5.5), Inches(9), Inches(1)).table
+        for cell in (table.cell(r, c) for r in range(2) for c in range(2)):
+            cell.text = lines.line()
+        slide.notes_slide.notes_text_frame.text = lines.line()
+    prs.save(path)
+
+
+def table_rows(units, lines):
+    fake = lines.fake
+    for i in range(units):
+        pii = lines.random.random() < lines.density
+        yield [
+            i,
+            fake.name() if pii else fake.job(),
+            fake.email() if pii else fake.word(),
+            fake.ipv4() if pii else fake.word(),
+            f"{fake.date()} {fake.time()}",
+            lines.line(),
+            lines.random.randint(0, 10**6),
+        ]
+
+
+TABLE_HEADER = ["id", "name", "email", "host", "seen", "note", "amount"]
+
+
+def make_csv(path, units, lines):
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(TABLE_HEADER)
+        writer.writerows(table_rows(units, lines))
+
+
+def make_xlsx(path, units, lines):
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet("data")
+    sheet.append(TABLE_HEADER)
+    for row in table_rows(units, lines):
+        sheet.append(row)
+    workbook.save(path)
+
+
+def make_txt(path, units, lines):
+    with open(path, "w") as f:
+        for _ in range(units):
+            f.write(lines.line() + "\n")
+
+
+def make_image(path, units, lines):
+    # ``units`` is the width in pixels, at a phone-photo aspect ratio
+    width, height = units, units * 4 // 3
+    rng = np.random.default_rng(lines.random.randint(0, 2**32 - 1))
+    image = np.clip(rng.normal(225, 12, (height, width, 3)), 0, 255).astype(np.uint8)
+    scale = max(width / 1600, 0.4)
+    y = int(60 * scale)
+    while y < height - 20:
+        cv2.putText(image, lines.line()[:70], (int(30 * scale), y), cv2.FONT_HERSHEY_SIMPLEX,
+                    scale, (20, 20, 20), max(1, int(2 * scale)), cv2.LINE_AA)
+        y += int(60 * scale)
+    cv2.imwrite(path, image)
+
+
+GENERATORS = {
+    "pdf": make_pdf,
+    "docx": make_docx,
+    "pptx": make_pptx,
+    "csv": make_csv,
+    "xlsx": make_xlsx,
+    "txt": make_txt,
+    "png": make_image,
+    "jpg": make_image,
+}
+
+# Default size per format, for a document that takes roughly a second
+DEFAULT_UNITS = {
+    "pdf": 20, "docx": 200, "pptx": 20, "csv": 20000, "xlsx": 5000, "txt": 20000, "png": 1600, "jpg": 1600,
+}
+
+
+def generate(root, formats=FORMATS, units=None, density=0.3, copies=1, seed=0):
+    """Write ``copies`` documents per format into ``root``; returns
+    ``{format: [paths]}``. ``units`` overrides ``DEFAULT_UNITS`` (an int or a
+    per-format dict)."""
+    os.makedirs(root, exist_ok=True)
+    corpus = {}
+    for fmt in formats:
+        size = units.get(fmt, DEFAULT_UNITS[fmt]) if isinstance(units, dict) else units or DEFAULT_UNITS[fmt]
+        corpus[fmt] = []
+        for copy in range(copies):
+            path = os.path.join(root, f"{fmt}_{size}_d{round(density * 100)}_s{seed + copy}.{fmt}")
+            if not os.path.exists(path):
+                GENERATORS[fmt](path, size, LineMaker(density, seed + copy))
+            corpus[fmt].append(path)
+    return corpus
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("out_dir")
+    parser.add_argument("--formats", default=",".join(FORMATS))
+    parser.add_argument("--units", type=int, help="pages/paragraphs/slides/rows, or image width")
+    parser.add_argument("--density", type=float, default=0.3, help="share of lines carrying PII")
+    parser.add_argument("--copies", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    corpus = generate(args.out_dir, args.formats.split(","), args.units, args.density, args.copies, args.seed)
+    for fmt, paths in corpus.items():
+        for path in paths:
+            print(f"{fmt:>5} {os.path.getsize(path):>10} {path}")
+
+
+if __name__ == "__main__":
+    main()
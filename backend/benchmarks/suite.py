@@ -0,0 +1,232 @@
+# backend/benchmarks/suite.py
+"""Throughput, latency and memory of every redactor, offline and reproducible.
+
+Generates a synthetic corpus (see benchmarks/corpus.py), then for each
+format and redaction level runs the engines through ``handle_file`` in a
+fresh pool of worker processes and, with ``--endpoint``, the ``/redact``
+endpoint in-process (or a running server with ``--url``) under concurrent
+load. Results are printed and saved as JSON for comparison across commits.
+
+Run from backend/:
+
+    python -m benchmarks.suite --formats pdf,docx,csv --levels 50,100 \\
+        --concurrency 4 --requests 16 --endpoint --out bench.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+# Identical inputs are sent over and over, so the result cache is off
+# unless asked for; it must be set before the app modules read it.
+if "--cache" not in sys.argv:
+    os.environ["REDACT_CACHE_MAX_MB"] = "0"
+
+from benchmarks.corpus import FORMATS, generate  # noqa: E402
+
+
+def redact_once(src, work_root, redaction_type, redaction_level):
+    """Worker entry point: redact a private copy of ``src``; returns
+    (seconds, peak RSS in bytes of this worker, error or None)."""
+    from app.com import handle_file
+
+    work_dir = tempfile.mkdtemp(dir=work_root)
+    path = os.path.join(work_dir, os.path.basename(src))
+    shutil.copyfile(src, path)
+    error = None
+    start = time.perf_counter()
+    try:
+        handle_file(path, redaction_type, redaction_level)
+    except Exception as exc:
+        error = f"{type(exc).__name__}: {exc}"
+    seconds = time.perf_counter() - start
+    shutil.rmtree(work_dir, ignore_errors=True)
+    return seconds, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024, error
+
+
+def percentile(values, q):
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, round(q / 100 * len(ordered)) - 1))]
+
+
+def summarize(kind, fmt, level, latencies, wall, total_bytes, peak_rss, errors):
+    ok = len(latencies)
+    return {
+        "kind": kind,
+        "format": fmt,
+        "level": level,
+        "requests": ok + len(errors),
+        "errors": len(errors),
+        "first_error": errors[0] if errors else None,
+        "throughput_per_s": round(ok / wall, 3) if wall else None,
+        "throughput_mb_per_s": round(total_bytes / 2**20 / wall, 3) if wall else None,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 1) if latencies else None,
+        "p99_ms": round(percentile(latencies, 99) * 1000, 1) if latencies else None,
+        "peak_rss_mb": round(peak_rss / 2**20, 1) if peak_rss else None,
+    }
+
+
+def bench_engine(paths, fmt, level, redaction_type, concurrency, requests, work_root):
+    inputs = [paths[i % len(paths)] for i in range(requests)]
+    latencies, errors, peak_rss = [], [], 0
+    # A fresh pool per cell, so peak RSS belongs to this format and level
+    with ProcessPoolExecutor(max_workers=concurrency) as executor:
+        # Warm-up: load models in every worker before timing
+        list(executor.map(redact_once, paths[:1] * concurrency, [work_root] * concurrency,
+                          [redaction_type] * concurrency, [level] * concurrency))
+        start = time.perf_counter()
+        futures = [executor.submit(redact_once, path, work_root, redaction_type, level) for path in inputs]
+        for future in futures:
+            seconds, rss, error = future.result()
+            peak_rss = max(peak_rss, rss)
+            if error:
+                errors.append(error)
+            else:
+                latencies.append(seconds)
+        wall = time.perf_counter() - start
+    total_bytes = sum(os.path.getsize(path) for path in inputs)
+    return summarize("engine", fmt, level, latencies, wall, total_bytes, peak_rss, errors)
+
+
+def process_rss():
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return max(own, children) * 1024
+
+
+async def bench_endpoint(client, paths, fmt, level, redaction_type, concurrency, requests, local):
+    inputs = [paths[i % len(paths)] for i in range(requests)]
+    payloads = {path: open(path, "rb").read() for path in set(inputs)}
+    slots = asyncio.Semaphore(concurrency)
+    latencies, errors = [], []
+
+    async def one(path):
+        async with slots:
+            start = time.perf_counter()
+            response = await client.post(
+                "/redact",
+                files={"file": (os.path.basename(path), payloads[path])},
+                data={"redaction_type": redaction_type, "redaction_level": str(level)},
+            )
+            seconds = time.perf_counter() - start
+            if response.status_code == 200:
+                latencies.append(seconds)
+            else:
+                errors.append(f"{response.status_code}: {response.text[:200]}")
+
+    await one(inputs[0])  # warm-up
+    latencies.clear()
+    errors.clear()
+    start = time.perf_counter()
+    await asyncio.gather(*(one(path) for path in inputs))
+    wall = time.perf_counter() - start
+    total_bytes = sum(len(payloads[path]) for path in inputs)
+    return summarize("endpoint", fmt, level, latencies, wall, total_bytes, process_rss() if local else None, errors)
+
+
+async def run_endpoint(corpus, levels, redaction_type, concurrency, requests, url):
+    import httpx
+
+    if url:
+        transport, local = None, False
+    else:
+        from app.main import app, pool
+        transport, local = httpx.ASGITransport(app=app), True
+    rows = []
+    async with httpx.AsyncClient(transport=transport, base_url=url or "http://bench", timeout=None) as client:
+        for fmt, paths in corpus.items():
+            for level in levels:
+                row = await bench_endpoint(client, paths, fmt, level, redaction_type, concurrency, requests, local)
+                print_row(row)
+                rows.append(row)
+    if local:
+        pool.shutdown()
+    return rows
+
+
+def print_row(row):
+    def show(value, spec):
+        return format(value, spec) if value is not None else format("-", spec.rstrip(".0123456789f") or ">")
+    print(
+        f"{row['kind']:>8} {row['format']:>5} {row['level']:>5} {row['requests']:>5} {row['errors']:>4} "
+        f"{show(row['throughput_per_s'], '>8.2f')} {show(row['p50_ms'], '>9.1f')} "
+        f"{show(row['p99_ms'], '>9.1f')} {show(row['peak_rss_mb'], '>8.1f')}",
+        flush=True,
+    )
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--formats", default=",".join(FORMATS))
+    parser.add_argument("--levels", default="25,50,75,100")
+    parser.add_argument("--type", default="black", dest="redaction_type")
+    parser.add_argument("--units", type=int, help="document size (see benchmarks.corpus), default per format")
+    parser.add_argument("--density", type=float, default=0.3, help="share of lines carrying PII")
+    parser.add_argument("--copies", type=int, default=2, help="distinct documents per format")
+    parser.add_argument("--concurrency", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--requests", type=int, default=8, help="documents redacted per format and level")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--corpus-dir", help="keep the generated corpus here (reused across runs)")
+    parser.add_argument("--no-engines", action="store_true", help="skip the direct engine runs")
+    parser.add_argument("--endpoint", action="store_true", help="also load-test /redact")
+    parser.add_argument("--url", help="load-test a running server instead of the in-process app")
+    parser.add_argument("--cache", action="store_true", help="leave the result cache enabled")
+    parser.add_argument("--out", help="write results as JSON here")
+    args = parser.parse_args()
+
+    levels = [int(level) for level in args.levels.split(",")]
+    corpus_dir = args.corpus_dir or tempfile.mkdtemp(prefix="redact-corpus-")
+    corpus = generate(corpus_dir, args.formats.split(","), args.units, args.density, args.copies, args.seed)
+
+    print(f"{'kind':>8} {'fmt':>5} {'level':>5} {'reqs':>5} {'errs':>4} {'files/s':>8} {'p50 ms':>9} {'p99 ms':>9} {'rss MB':>8}")
+    rows = []
+    with tempfile.TemporaryDirectory(prefix="redact-bench-") as work_root:
+        if not args.no_engines:
+            for fmt, paths in corpus.items():
+                for level in levels:
+                    row = bench_engine(paths, fmt, level, args.redaction_type, args.concurrency, args.requests, work_root)
+                    print_row(row)
+                    rows.append(row)
+    if args.endpoint or args.url:
+        rows.extend(asyncio.run(run_endpoint(
+            corpus, levels, args.redaction_type, args.concurrency, args.requests, args.url
+        )))
+
+    report = {
+        "commit": git_commit(),
+        "timestamp": time.time(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "config": {k: v for k, v in vars(args).items() if k not in ("out", "corpus_dir")},
+        "results": rows,
+    }
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"results written to {args.out}")
+    if not args.corpus_dir:
+        shutil.rmtree(corpus_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
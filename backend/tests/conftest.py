@@ -0,0 +1,28 @@
+import pytest
+from app.cache import ResultCache
+from app.model.Detector import Span
+from app.model.NER import NERService
+
+
+@pytest.fixture
+def ner(monkeypatch, tmp_path):
+    """Stub NER tagging "Zed Quark" as PERSON, with a private result cache;
+    returns the list of texts of every batch it was called with."""
+    calls = []
+
+    def entities_many(texts, labels=None, model=None, n_process=None):
+        calls.append(list(texts))
+        results = []
+        for text in texts:
+            spans = []
+            start = text.find("Zed Quark")
+            while start != -1:
+                if labels is None or "PERSON" in labels:
+                    spans.append(Span(start, start + 9, "Zed Quark", "PERSON"))
+                start = text.find("Zed Quark", start + 1)
+            results.append(spans)
+        return results
+
+    monkeypatch.setattr(NERService, "entities_many", staticmethod(entities_many))
+    monkeypatch.setattr(ResultCache, "_default", ResultCache(root=str(tmp_path / "cache"), max_bytes=2**20))
+    return calls
@@ -0,0 +1,86 @@
+import os
+import time
+import zipfile
+from concurrent.futures import Future
+import pytest
+from app import batch
+from app.batch import BatchRun, extract_zip
+
+
+def _zip(path, members):
+    with zipfile.ZipFile(path, "w") as archive:
+        for name, data in members.items():
+            archive.writestr(name, data)
+    return str(path)
+
+
+def test_extract_zip_keeps_relative_paths(tmp_path):
+    archive = _zip(tmp_path / "in.zip", {"a.txt": "a", "sub/b.txt": "b"})
+    extract_zip(archive, str(tmp_path / "out"))
+    assert (tmp_path / "out" / "sub" / "b.txt").read_text() == "b"
+
+
+@pytest.mark.parametrize("name", ["../evil.txt", "sub/../../evil.txt", "/abs/evil.txt"])
+def test_extract_zip_refuses_paths_outside_the_target(tmp_path, name):
+    archive = _zip(tmp_path / "in.zip", {name: "x"})
+    with pytest.raises(ValueError):
+        extract_zip(archive, str(tmp_path / "out"))
+    assert not (tmp_path / "evil.txt").exists()
+
+
+def test_extract_zip_limits(tmp_path, monkeypatch):
+    archive = _zip(tmp_path / "in.zip", {"a.txt": "x" * 10, "b.txt": "y" * 10})
+    monkeypatch.setattr(batch, "MAX_ARCHIVE_FILES", 1)
+    with pytest.raises(ValueError):
+        extract_zip(archive, str(tmp_path / "out"))
+    monkeypatch.setattr(batch, "MAX_ARCHIVE_FILES", 10)
+    monkeypatch.setattr(batch, "MAX_ARCHIVE_BYTES", 15)
+    with pytest.raises(ValueError):
+        extract_zip(archive, str(tmp_path / "out"))
+
+
+def _inputs(root, names):
+    os.makedirs(root)
+    paths = []
+    for name in names:
+        path = os.path.join(root, name)
+        with open(path, "w") as f:
+            f.write(name)
+        paths.append((name, path))
+    return paths
+
+
+def test_files_that_never_finish_time_out(tmp_path):
+    inputs = _inputs(str(tmp_path / "in"), ["a.txt", "b.txt", "c.bin"])
+    submitted = []
+
+    def submit(fn, *args):
+        submitted.append(Future())  # never completes
+        return submitted[-1]
+
+    run = BatchRun(str(tmp_path / "out"), "black", 50)
+    manifest = run.run(inputs, submit, window=1, timeout=0.05)
+    assert manifest["summary"] == {"done": 0, "failed": 2, "skipped": 1}
+    assert all(future.cancelled() for future in submitted)
+    errors = {entry["error"] for entry in manifest["files"] if entry["status"] == "failed"}
+    assert errors == {"Redaction timed out"}
+
+
+def test_deadline_fails_running_and_queued_files(tmp_path):
+    inputs = _inputs(str(tmp_path / "in"), ["a.txt", "b.txt", "c.txt"])
+    run = BatchRun(str(tmp_path / "out"), "black", 50)
+    start = time.monotonic()
+    manifest = run.run(inputs, lambda fn, *args: Future(), window=1, deadline=start + 0.05)
+    assert time.monotonic() - start < 5
+    assert manifest["summary"]["failed"] == 3
+    assert {entry["error"] for entry in manifest["files"]} == {"Batch timed out"}
+
+
+def test_submit_errors_fail_the_file(tmp_path):
+    inputs = _inputs(str(tmp_path / "in"), ["a.txt"])
+
+    def submit(fn, *args):
+        raise RuntimeError("queue is full")
+
+    manifest = BatchRun(str(tmp_path / "out"), "black", 50).run(inputs, submit, window=2)
+    assert manifest["files"][0]["error"] == "queue is full"
@@ -0,0 +1,45 @@
+import os
+from app.cache import ENGINE_VERSION, ResultCache, _engine_version
+
+
+def test_artifacts_stay_in_memory_by_default(tmp_path):
+    cache = ResultCache(root=str(tmp_path), max_bytes=2**20, artifacts_on_disk=False)
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return [[0, 8, "jane doe", "PERSON"]]
+
+    assert cache.artifact("abc", "pdf-entities", compute) == [[0, 8, "jane doe", "PERSON"]]
+    assert cache.artifact("abc", "pdf-entities", compute) == [[0, 8, "jane doe", "PERSON"]]
+    assert len(calls) == 1
+    assert not os.path.exists(cache.artifacts_dir)
+
+
+def test_artifacts_on_disk_are_opt_in(tmp_path):
+    cache = ResultCache(root=str(tmp_path), max_bytes=2**20, artifacts_on_disk=True)
+    cache.store_artifact("abc", "ocr", {"text": ["x"]})
+    assert os.listdir(os.path.join(cache.artifacts_dir, "abc"))
+    reopened = ResultCache(root=str(tmp_path), max_bytes=2**20, artifacts_on_disk=True)
+    assert reopened.load_artifact("abc", "ocr") == {"text": ["x"]}
+
+
+def test_disabled_cache_keeps_nothing(tmp_path):
+    cache = ResultCache(root=str(tmp_path), max_bytes=0, artifacts_on_disk=False)
+    cache.store_artifact("abc", "ocr", [1])
+    assert cache.load_artifact("abc", "ocr") is None
+
+
+def test_engine_version_follows_output_settings(monkeypatch):
+    monkeypatch.setenv("REDACT_OCR_LANGS", "eng")
+    before = _engine_version()
+    monkeypatch.setenv("REDACT_CACHE_DIR", "elsewhere")  # not read by the engine
+    assert _engine_version() == before
+    monkeypatch.setenv("REDACT_OCR_LANGS", "deu")
+    assert _engine_version() != before
+
+
+def test_key_ignores_extension_case():
+    key = ResultCache.key("d", "a.pdf", "black", 50)
+    assert key == ResultCache.key("d", "b.PDF", "black", 50)
+    assert key != ResultCache.key("d", "a.pdf", "blur", 50)
@@ -0,0 +1,9 @@
+import pytest
+from app import cli
+
+
+@pytest.mark.parametrize("args", [["--type", "pixelate"], ["--level", "30"]])
+def test_rejects_unknown_type_and_level(tmp_path, args):
+    with pytest.raises(SystemExit) as exc:
+        cli.main([str(tmp_path / "in"), str(tmp_path / "out"), *args])
+    assert exc.value.code == 2
@@ -0,0 +1,50 @@
+from app.model.Detector import PatternDetector, Span
+
+
+def labels(spans):
+    return [(span.text, span.label) for span in spans]
+
+
+def test_scan_finds_each_label_in_order():
+    text = "Mail jane@example.org from 10.0.0.1 at 2024-01-31"
+    spans = PatternDetector.scan(text, ["EMAIL", "IPV4", "DATE"])
+    assert labels(spans) == [("jane@example.org", "EMAIL"), ("10.0.0.1", "IPV4"), ("2024-01-31", "DATE")]
+    for span in spans:
+        assert text[span.start:span.end] == span.text
+
+
+def test_scan_only_reports_requested_labels():
+    assert PatternDetector.scan("10.0.0.1 on 2024-01-31", ["DATE"]) == [Span(12, 22, "2024-01-31", "DATE")]
+    assert PatternDetector.scan("nothing here", ["EMAIL"]) == []
+    assert PatternDetector.scan("jane@example.org", []) == []
+
+
+def test_overlapping_match_of_another_label_is_reported():
+    # The email wins the combined scan; the hostname inside it is still found
+    spans = PatternDetector.scan("write to jane@acme.com now", ["EMAIL", "HOSTNAME"])
+    assert labels(spans) == [("jane@acme.com", "EMAIL"), ("acme.com", "HOSTNAME")]
+
+
+def test_same_label_is_not_reported_twice():
+    spans = PatternDetector.scan("Jane Anne Smith", ["NAME", "EMAIL"])
+    assert labels(spans) == [("Jane Anne Smith", "NAME")]
+
+
+def test_image_phones_may_omit_the_area_code():
+    assert PatternDetector.scan("call 555-1234", ["PHONE"]) == []
+    assert labels(PatternDetector.scan("call 555-1234", ["PHONE"], "image")) == [("555-1234", "PHONE")]
+    assert labels(PatternDetector.scan("call 555.123.4567", ["PHONE"], "image")) == [("555.123.4567", "PHONE")]
+
+
+def test_table_pattern_sets():
+    assert labels(PatternDetector.scan("at 10:20", ["TIME"])) == [("10:20", "TIME")]
+    assert PatternDetector.scan("at 10:20", ["TIME"], "csv") == []
+    assert labels(PatternDetector.scan("at 10:20:30", ["TIME"], "file")) == [("10:20:30", "TIME")]
+    assert labels(PatternDetector.scan("on 5Feb23", ["DATE"], "csv")) == [("5Feb23", "DATE")]
+    assert PatternDetector.scan("on 5Feb23", ["DATE"], "file") == []
+
+
+def test_compile_gives_the_label_as_group_name():
+    regex = PatternDetector.compile(frozenset(["EMAIL", "IPV4"]))
+    assert regex.search("host 192.168.1.1").lastgroup == "IPV4"
+    assert PatternDetector.compile(frozenset()) is None
@@ -0,0 +1,48 @@
+import docx
+from app.model.DOCRedact import DOCRedactor
+
+
+def make_docx(path):
+    doc = docx.Document()
+    paragraph = doc.add_paragraph()
+    paragraph.add_run("Signed by Ze").bold = True
+    paragraph.add_run("d Qua").italic = True
+    paragraph.add_run("rk today.")
+    outer = doc.add_table(rows=1, cols=2)
+    outer.cell(0, 0).text = "Owner"
+    inner = outer.cell(0, 1).add_table(rows=1, cols=1)
+    inner.cell(0, 0).text = "Zed Quark (lead)"
+    section = doc.sections[0]
+    section.header.paragraphs[0].text = "Prepared for Zed Quark"
+    section.footer.paragraphs[0].text = "Contact zed@example.com"
+    doc.save(path)
+
+
+def test_redacts_split_runs_tables_headers_and_footers(ner, tmp_path):
+    path = str(tmp_path / "letter.docx")
+    make_docx(path)
+
+    output = DOCRedactor.redact(path, "black", 100)
+    assert output == str(tmp_path / "letter_redacted.docx")
+    doc = docx.Document(output)
+
+    # Each run keeps its formatting; only the entity's characters are masked
+    runs = doc.paragraphs[0].runs
+    assert [run.text for run in runs] == ["Signed by ██", "█████", "██ today."]
+    assert [run.bold for run in runs] == [True, None, None]
+    assert [run.italic for run in runs] == [None, True, None]
+
+    inner = doc.tables[0].cell(0, 1).tables[0]
+    assert inner.cell(0, 0).text == "█████████ (lead)"
+    assert doc.tables[0].cell(0, 0).text == "Owner"
+    section = doc.sections[0]
+    assert section.header.paragraphs[0].text == "Prepared for █████████"
+    assert section.footer.paragraphs[0].text == "Contact ███████████████"
+
+
+def test_untouched_document_is_returned_as_is(ner, tmp_path):
+    path = str(tmp_path / "plain.docx")
+    doc = docx.Document()
+    doc.add_paragraph("Nothing to see here.")
+    doc.save(path)
+    assert DOCRedactor.redact(path, "black", 100) == path
@@ -0,0 +1,77 @@
+import os
+import pytest
+from app.jobs import JobProgress, JobStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    return JobStore(str(tmp_path / "jobs"))
+
+
+def test_create_and_get(store):
+    job = store.create("../secret/report.pdf", "black", 75)
+    assert job["filename"] == "report.pdf"
+    assert store.get(job["id"]) == job
+    assert store.input_path(job) == os.path.join(store.root, job["id"], "report.pdf")
+    assert store.result_path(job) is None
+
+
+def test_unknown_and_malformed_ids(store):
+    assert store.get("0" * 32) is None
+    assert store.get("../../etc") is None
+    assert store.update("0" * 32, status="done") is None
+
+
+def test_update_records_progress(store):
+    job = store.create("a.docx", "black", 50)
+    progress = JobProgress(store, job["id"])
+    progress(3, 10)
+    assert store.get(job["id"])["progress"] == {"done": 3, "total": 10}
+
+
+def test_terminal_states_are_final(store):
+    job = store.create("a.pdf", "black", 100)
+    store.update(job["id"], status="failed", error="Redaction timed out")
+
+    # A worker finishing after the timeout must not overwrite the failure
+    assert store.update(job["id"], status="done", result="redacted_a.pdf")["status"] == "failed"
+    job = store.get(job["id"])
+    assert job["status"] == "failed" and job["result"] is None
+
+
+def test_complete_from(store, tmp_path):
+    result = tmp_path / "redacted_a.pdf"
+    result.write_bytes(b"%PDF")
+    job = store.create("a.pdf", "black", 100)
+
+    done = store.complete_from(job["id"], str(result))
+    assert done["status"] == "done"
+    with open(store.result_path(done), "rb") as f:
+        assert f.read() == b"%PDF"
+
+
+def test_complete_from_renames_the_result(store, tmp_path):
+    # A cache hit carries the first uploader's name
+    result = tmp_path / "redacted_first.pdf"
+    result.write_bytes(b"%PDF")
+    job = store.create("second.pdf", "black", 100)
+
+    done = store.complete_from(job["id"], str(result), "redacted_second.pdf")
+    assert done["result"] == "redacted_second.pdf"
+    assert os.path.exists(store.result_path(done))
+
+
+def test_complete_from_is_a_no_op_once_terminal(store, tmp_path):
+    result = tmp_path / "redacted_a.pdf"
+    result.write_bytes(b"%PDF")
+    job = store.create("a.pdf", "black", 100)
+    store.update(job["id"], status="failed", error="boom")
+
+    assert store.complete_from(job["id"], str(result))["status"] == "failed"
+    assert not os.path.exists(os.path.join(store.root, job["id"], "redacted_a.pdf"))
+
+
+def test_delete(store):
+    job = store.create("a.pdf", "black", 100)
+    store.delete(job["id"])
+    assert store.get(job["id"]) is None
@@ -0,0 +1,31 @@
+from app import metrics
+from app.metrics import Histogram
+
+
+def test_histogram_render_is_cumulative_per_label():
+    histogram = Histogram("t_seconds", "Test.", "stage", buckets=(0.1, 1))
+    histogram.observe("b", 0.05)
+    histogram.observe("b", 0.5)
+    histogram.observe("b", 5)
+    histogram.observe("a", 1)
+    assert histogram.render() == [
+        "# HELP t_seconds Test.",
+        "# TYPE t_seconds histogram",
+        't_seconds_bucket{stage="a",le="0.1"} 0',
+        't_seconds_bucket{stage="a",le="1"} 1',
+        't_seconds_bucket{stage="a",le="+Inf"} 1',
+        't_seconds_sum{stage="a"} 1.000000',
+        't_seconds_count{stage="a"} 1',
+        't_seconds_bucket{stage="b",le="0.1"} 1',
+        't_seconds_bucket{stage="b",le="1"} 2',
+        't_seconds_bucket{stage="b",le="+Inf"} 3',
+        't_seconds_sum{stage="b"} 5.550000',
+        't_seconds_count{stage="b"} 3',
+    ]
+
+
+def test_collect_buffers_worker_samples_and_render_adds_gauges():
+    result, samples = metrics.collect(lambda: metrics.observe("x", 0.2) or 42, ())
+    assert (result, samples) == (42, [("x", 0.2)])
+    text = metrics.render(gauges=[("g", "A gauge.", 3)])
+    assert text.endswith("# HELP g A gauge.\n# TYPE g gauge\ng 3\n")
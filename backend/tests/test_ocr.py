@@ -0,0 +1,151 @@
+import sys
+import threading
+import types
+import numpy as np
+import pytest
+from app.model.Detector import PatternDetector, Span
+from app.model.OCR import OCRBackend, OCRTextIndex, TesseractCLI, TesserocrPool, parse_tsv
+
+HEADER = "level\tpage_num\tblock_num\tpar_num\tline_num\tword_num\tleft\ttop\twidth\theight\tconf\ttext"
+
+
+def tsv(*words):
+    """TSV rows for ``(block, par, line, word, left, top, width, height, text)``."""
+    rows = [HEADER, "1\t1\t0\t0\t0\t0\t0\t0\t500\t100\t-1\t"]
+    for block, par, line, word, left, top, width, height, text in words:
+        rows.append(f"5\t1\t{block}\t{par}\t{line}\t{word}\t{left}\t{top}\t{width}\t{height}\t91.5\t{text}")
+    return "\n".join(rows) + "\n"
+
+
+def test_parse_tsv():
+    data = parse_tsv(tsv((1, 1, 1, 1, 10, 20, 30, 12, "hello"), (1, 1, 1, 2, 45, 20, 30, 12, "world")))
+    assert data["text"] == ["", "hello", "world"]
+    assert data["left"] == [0, 10, 45]
+    assert data["conf"] == [-1.0, 91.5, 91.5]
+    assert data["line_num"] == [0, 1, 1]
+
+
+def test_parse_tsv_keeps_rows_without_text_column():
+    data = parse_tsv(HEADER + "\n5\t1\t1\t1\t1\t1\t0\t0\t5\t5\t95\n")
+    assert data["text"] == [""]
+
+
+class FakeAPI:
+    instances = []
+
+    def __init__(self, lang, psm, oem):
+        if lang == "missing":
+            raise RuntimeError("Failed to init API, possibly an invalid tessdata path")
+        assert isinstance(psm, int)
+        self.lang = lang
+        FakeAPI.instances.append(self)
+
+    def Clear(self):
+        pass
+
+    def SetImageBytes(self, data, width, height, bytes_per_pixel, bytes_per_line):
+        pass
+
+    def Recognize(self):
+        pass
+
+    def GetTSVText(self, page):
+        return tsv((1, 1, 1, 1, 0, 0, 5, 5, "hi"))
+
+
+@pytest.fixture
+def tesserocr(monkeypatch):
+    module = types.ModuleType("tesserocr")
+    module.PyTessBaseAPI = FakeAPI
+    module.OEM = types.SimpleNamespace(DEFAULT=3)
+    monkeypatch.setitem(sys.modules, "tesserocr", module)
+    FakeAPI.instances = []
+    return module
+
+
+def test_backend_selection(monkeypatch, tesserocr):
+    assert isinstance(OCRBackend.create("auto", 2), TesserocrPool)
+    assert isinstance(OCRBackend.create("tesseract", 2), TesseractCLI)
+    monkeypatch.setitem(sys.modules, "tesserocr", None)
+    assert isinstance(OCRBackend.create("auto", 2), TesseractCLI)
+    with pytest.raises(ImportError):
+        OCRBackend.create("tesserocr", 2)
+
+
+def test_pool_reuses_released_handles(tesserocr):
+    pool = TesserocrPool(2)
+    first = pool.acquire("eng", 6)
+    second = pool.acquire("eng", 6)
+    pool.release("eng", 6, first)
+    assert pool.acquire("eng", 6) is first
+    assert len(FakeAPI.instances) == 2
+
+    # At the size limit callers wait for a handle to come back
+    got = []
+    waiter = threading.Thread(target=lambda: got.append(pool.acquire("eng", 6)))
+    waiter.start()
+    pool.release("eng", 6, second)
+    waiter.join(5)
+    assert got == [second]
+
+
+def test_failed_handle_creation_frees_its_slot(tesserocr):
+    pool = TesserocrPool(1)
+    for _ in range(3):
+        with pytest.raises(RuntimeError):
+            pool.acquire("missing", 6)
+    assert pool.created[("missing", 6)] == 0
+    assert pool.acquire("eng", 6).lang == "eng"
+
+
+def test_image_to_data_releases_the_handle(tesserocr):
+    pool = TesserocrPool(1)
+    for _ in range(2):
+        data = pool.image_to_data(np.zeros((10, 10), np.uint8), "eng")
+        assert data["text"][-1] == "hi"
+    assert len(FakeAPI.instances) == 1
+
+
+def index_of(*words):
+    return OCRTextIndex(parse_tsv(tsv(*words)))
+
+
+LETTER = index_of(
+    (1, 1, 1, 1, 10, 20, 40, 12, "Write"),
+    (1, 1, 1, 2, 55, 20, 20, 12, "to"),
+    (1, 1, 1, 3, 80, 22, 90, 12, "jane@example.com"),
+    (1, 1, 2, 1, 10, 40, 30, 12, "from"),
+    (1, 1, 2, 2, 45, 40, 30, 12, "John"),
+    (1, 1, 3, 1, 10, 60, 40, 14, "Smith,"),
+    (1, 1, 3, 2, 55, 60, 30, 12, "Acme"),
+)
+
+
+def test_text_index_joins_words_and_lines():
+    assert LETTER.text == "Write to jane@example.com\nfrom John\nSmith, Acme"
+
+
+def test_text_index_maps_a_regex_match_to_its_word():
+    [span] = PatternDetector.finditer(LETTER.text, ["EMAIL"], "image")
+    assert LETTER.rects(span.start, span.end) == [(80, 22, 90, 12)]
+
+
+def test_text_index_merges_words_on_one_line():
+    start = LETTER.text.index("to jane")
+    assert LETTER.rects(start, start + len("to jane")) == [(55, 20, 115, 14)]
+
+
+def test_text_index_splits_matches_across_lines():
+    # An entity wrapped onto the next line gets one box per line
+    start = LETTER.text.index("John\nSmith")
+    entity = Span(start, start + len("John\nSmith"), "John Smith", "PERSON")
+    assert LETTER.rects(entity.start, entity.end) == [(45, 40, 30, 12), (10, 60, 40, 14)]
+
+
+def test_text_index_ignores_separators_and_partial_words():
+    # A match starting on a separator or inside a word still covers whole words
+    start = LETTER.text.index(" jane")
+    assert list(LETTER.word_range(start, start + 5)) == [2]
+    start = LETTER.text.index("mith")
+    assert list(LETTER.word_range(start, start + 2)) == [5]
+    assert LETTER.rects(len(LETTER.text), len(LETTER.text)) == []
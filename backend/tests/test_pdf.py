@@ -0,0 +1,31 @@
+import fitz
+from app.model.PDFRedact import PDFRedactor
+
+
+def make_pdf(*pages):
+    doc = fitz.open()
+    for text in pages:
+        doc.new_page().insert_text((72, 72), text)
+    return doc
+
+
+def test_scan_labels_follow_the_redaction_level():
+    assert set(PDFRedactor.scan_labels(25)) == {'EMAIL', 'PHONE', 'IPV4', 'IPV6'}
+    assert 'DATE' in PDFRedactor.scan_labels(50)
+    # Names are only redacted at the top level, and only by pattern on scans
+    assert 'NAME' not in PDFRedactor.scan_labels(75)
+    assert 'NAME' in PDFRedactor.scan_labels(100)
+
+
+def test_detection_runs_ner_once_per_range(ner):
+    doc = make_pdf("Notes by Zed Quark.", "Mail zed@example.com", "Notes by Zed Quark.")
+    steps = []
+    known = PDFRedactor.detect_pages(doc, 0, 3, 100, progress=lambda done, total: steps.append(done))
+    assert known == {"Zed Quark": "PERSON", "zed@example.com": "EMAIL"}
+    # Repeated page text is only sent once
+    assert ner == [["Notes by Zed Quark.", "Mail zed@example.com"]]
+    assert steps == [1, 2, 3]
+
+    # Cached page texts skip NER on the next pass
+    PDFRedactor.detect_pages(doc, 0, 3, 25)
+    assert len(ner) == 1
@@ -0,0 +1,47 @@
+import fitz
+from app.model.PDFIndex import PageTextIndex
+
+
+def make_page(*lines):
+    doc = fitz.open()
+    page = doc.new_page()
+    for n, text in enumerate(lines):
+        page.insert_text((72, 72 + 20 * n), text)
+    return doc, page
+
+
+def covered(page, rect):
+    """Characters whose box centre lies in ``rect``."""
+    chars = []
+    for block in page.get_text("rawdict")["blocks"]:
+        for line in block.get("lines", ()):
+            for span in line["spans"]:
+                for char in span["chars"]:
+                    x0, y0, x1, y1 = char["bbox"]
+                    if fitz.Point((x0 + x1) / 2, (y0 + y1) / 2) in rect:
+                        chars.append(char["c"])
+    return "".join(chars)
+
+
+def test_rects_cover_exactly_the_entity():
+    doc, page = make_page("Contact Zed Quark today, or zed quark tomorrow.")
+    index = PageTextIndex.from_page(page)
+    rects = index.locate("Zed Quark")
+    # Matching ignores case; each occurrence gets its own rect
+    assert [covered(page, rect) for rect in rects] == ["Zed Quark", "zed quark"]
+    assert [rect.round() for rect in rects] == [rect.round() for rect in page.search_for("Zed Quark")]
+
+
+def test_entity_wrapped_across_lines_gets_a_rect_per_line():
+    doc, page = make_page("Signed by Zed", "Quark, director")
+    index = PageTextIndex.from_page(page)
+    rects = index.locate("Zed Quark")
+    assert [covered(page, rect) for rect in rects] == ["Zed", "Quark"]
+
+
+def test_entities_anchor_on_their_first_token():
+    doc, page = make_page("Fred Quark and Zed Quark")
+    index = PageTextIndex.from_page(page)
+    # "Fred" contains "ed" but is another token
+    assert index.locate("Ed Quark") == []
+    assert list(index.find("zed quark")) == [(15, 24)]
@@ -0,0 +1,60 @@
+import asyncio
+import os
+import time
+import pytest
+from concurrent.futures.process import BrokenProcessPool
+from app.pool import PoolFull, RedactionPool
+
+
+@pytest.fixture
+def pool():
+    pool = RedactionPool(workers=1, max_pending=1, timeout=30, retry_after=7)
+    yield pool
+    pool.shutdown()
+
+
+def test_run_returns_the_worker_result(pool):
+    assert asyncio.run(pool.run(pow, 2, 10)) == 1024
+    assert pool.pending == 0
+
+
+def test_submit_beyond_max_pending_raises_pool_full(pool):
+    future = pool.submit(time.sleep, 0.5)
+    with pytest.raises(PoolFull) as info:
+        pool.submit(time.sleep, 0)
+    assert info.value.retry_after == 7
+    future.result()
+    pool.submit(time.sleep, 0).result()
+
+
+def test_worker_exceptions_propagate(pool):
+    with pytest.raises(ValueError):
+        asyncio.run(pool.run(int, "not a number"))
+    assert pool.pending == 0
+
+
+def test_run_times_out():
+    pool = RedactionPool(workers=1, max_pending=2, timeout=0.2)
+    try:
+        with pytest.raises(asyncio.TimeoutError):
+            asyncio.run(pool.run(time.sleep, 2))
+    finally:
+        pool.shutdown()
+
+
+def test_workers_report_their_model_stats(pool):
+    assert pool.worker_models() == {}
+    asyncio.run(pool.run(pow, 2, 3))
+    with pytest.raises(ValueError):
+        asyncio.run(pool.run(int, "not a number"))
+    workers = pool.worker_models()
+    assert len(workers) == 1
+    (pid, stats), = workers.items()
+    assert pid.isdigit() and isinstance(stats, dict)
+
+
+def test_pool_recovers_after_a_worker_dies(pool):
+    with pytest.raises(BrokenProcessPool):
+        asyncio.run(pool.run(os._exit, 1))
+    assert asyncio.run(pool.run(pow, 2, 3)) == 8
+    assert pool.pending == 0
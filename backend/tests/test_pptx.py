@@ -0,0 +1,56 @@
+from pptx import Presentation
+from pptx.shapes.group import GroupShape
+from pptx.util import Inches
+from app.model.PresentRedactor import PresentationRedactor
+
+
+def test_text_frames_inside_nested_groups():
+    prs = Presentation()
+    slide = prs.slides.add_slide(prs.slide_layouts[6])
+    outer = slide.shapes.add_group_shape()
+    inner = outer.shapes.add_group_shape()
+    inner.shapes.add_textbox(Inches(1), Inches(1), Inches(2), Inches(1)).text_frame.text = "nested"
+    outer.shapes.add_textbox(Inches(1), Inches(2), Inches(2), Inches(1)).text_frame.text = "grouped"
+
+    frames = PresentationRedactor().iter_text_frames(slide.shapes)
+    assert sorted(frame.text for frame in frames) == ["grouped", "nested"]
+
+
+def make_deck(path):
+    prs = Presentation()
+    slide = prs.slides.add_slide(prs.slide_layouts[6])
+    group = slide.shapes.add_group_shape()
+    paragraph = group.shapes.add_textbox(Inches(1), Inches(1), Inches(4), Inches(1)).text_frame.paragraphs[0]
+    first = paragraph.add_run()
+    first.text, first.font.bold = "Presented by Zed ", True
+    second = paragraph.add_run()
+    second.text, second.font.italic = "Quark", True
+    table = slide.shapes.add_table(2, 2, Inches(1), Inches(3), Inches(4), Inches(1)).table
+    table.cell(0, 0).text = "Owner"
+    table.cell(0, 1).text = "Zed Quark"
+    table.cell(1, 0).text = "Mail"
+    table.cell(1, 1).text = "zed@example.com"
+    slide.notes_slide.notes_text_frame.text = "Thank Zed Quark"
+    prs.save(path)
+
+
+def test_redacts_groups_tables_and_notes(ner, tmp_path):
+    path = str(tmp_path / "deck.pptx")
+    make_deck(path)
+
+    output = PresentationRedactor().redact(path, "black", 100)
+    assert output == str(tmp_path / "redacted_deck.pptx")
+    slide = Presentation(output).slides[0]
+
+    group = next(shape for shape in slide.shapes if isinstance(shape, GroupShape))
+    runs = group.shapes[0].text_frame.paragraphs[0].runs
+    assert [run.text for run in runs] == ["Presented by ████", "█████"]
+    assert [(run.font.bold, run.font.italic) for run in runs] == [(True, None), (None, True)]
+
+    table = next(shape for shape in slide.shapes if shape.has_table).table
+    assert [[cell.text for cell in row.cells] for row in table.rows] == [
+        ["Owner", "█████████"], ["Mail", "███████████████"],
+    ]
+    assert slide.notes_slide.notes_text_frame.text == "Thank █████████"
+    # All paragraphs went through NER in one batch
+    assert len(ner) == 1
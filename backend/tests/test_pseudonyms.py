@@ -0,0 +1,16 @@
+from concurrent.futures import ThreadPoolExecutor
+from app.model.Pseudonyms import PseudonymEngine
+
+
+def test_same_value_gets_one_pseudonym_across_threads():
+    pseudonyms = PseudonymEngine(pool_size=4, key="").for_document()
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = list(executor.map(lambda i: pseudonyms("PERSON", "Jane  Doe" if i % 2 else "jane doe"), range(200)))
+    assert len(set(results)) == 1
+    assert len(pseudonyms.mapping) == 1
+
+
+def test_keyed_pseudonyms_are_stable_across_documents():
+    engine = PseudonymEngine(key="secret")
+    first = engine.for_document("acme")("EMAIL", "a@b.com")
+    assert engine.for_document("acme")("EMAIL", "a@b.com") == first
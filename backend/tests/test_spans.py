@@ -0,0 +1,73 @@
+from app.model.Detector import LiteralMatcher, Span
+from app.model.Spans import SpanRewriter
+
+
+def test_merge_sorts_and_folds_overlaps():
+    spans = [Span(10, 14, "x", "B"), Span(0, 5, "y", "A"), Span(3, 8, "z", "C"), Span(14, 16, "w", "D")]
+    merged = SpanRewriter.merge(spans)
+    assert [(s.start, s.end, s.label) for s in merged] == [(0, 8, "A"), (10, 14, "B"), (14, 16, "D")]
+
+
+def test_merge_prefers_the_longest_span_on_ties():
+    merged = SpanRewriter.merge([Span(0, 3, "abc", "SHORT"), Span(0, 6, "abcdef", "LONG")])
+    assert merged == [Span(0, 6, "abcdef", "LONG")]
+
+
+def test_merge_drops_contained_spans():
+    assert SpanRewriter.merge([Span(0, 10, "t", "A"), Span(2, 4, "u", "B")]) == [Span(0, 10, "t", "A")]
+
+
+def test_rewrite_masks_every_span_once():
+    text = "id 10.0.0.1 at 2024-01-31"
+    spans = [Span(3, 11, "10.0.0.1", "IPV4"), Span(15, 25, "2024-01-31", "DATE")]
+    assert SpanRewriter.rewrite(text, spans, "black") == "id ████████ at ██████████"
+    assert SpanRewriter.rewrite(text, spans, "blur") == "id -------- at ----------"
+
+
+def test_rewrite_overlapping_spans():
+    assert SpanRewriter.rewrite("abcdefgh", [Span(1, 4, "bcd", "A"), Span(3, 6, "def", "B")], "black") == "a█████gh"
+
+
+def test_rewrite_without_spans_returns_the_text():
+    assert SpanRewriter.rewrite("unchanged", [], "black") == "unchanged"
+
+
+def test_rewrite_synthetic_and_fallback():
+    spans = [Span(0, 4, "Jane", "PERSON")]
+    assert SpanRewriter.rewrite("Jane left", spans, "synthetic", synthetic=lambda label, text: "Ann") == "Ann left"
+    assert SpanRewriter.rewrite("Jane left", spans, "other", fallback="[X]") == "[X] left"
+    assert SpanRewriter.rewrite("Jane left", spans, "other") == "Jane left"
+
+
+def test_literal_matcher_prefers_longest_literal():
+    matcher = LiteralMatcher([("Jane", "PERSON"), ("Jane Smith", "PERSON"), ("Acme", "ORG")])
+    spans = matcher.scan("Jane Smith of Acme met Jane")
+    assert [(s.text, s.label) for s in spans] == [("Jane Smith", "PERSON"), ("Acme", "ORG"), ("Jane", "PERSON")]
+
+
+def test_literal_matcher_escapes_and_first_label_wins():
+    matcher = LiteralMatcher([("$5.00", "MONEY"), ("$5.00", "OTHER"), ("", "EMPTY")])
+    assert matcher.scan("pay $5.00 or $5x00") == [Span(4, 9, "$5.00", "MONEY")]
+    assert LiteralMatcher([]).scan("anything") == []
+
+
+def test_rewrite_runs_splits_masks_across_runs():
+    texts = ["Call ", "John", " Sm", "ith now"]
+    spans = [Span(5, 15, "John Smith", "PERSON")]
+    changed = SpanRewriter.rewrite_runs(texts, spans, "black")
+    assert changed == {1: "████", 2: "███", 3: "███ now"}
+    assert "".join(changed.get(i, t) for i, t in enumerate(texts)) == "Call ██████████ now"
+
+
+def test_rewrite_runs_puts_other_replacements_in_the_first_run():
+    texts = ["Call ", "John", " Smith", " now"]
+    spans = [Span(5, 15, "John Smith", "PERSON")]
+    changed = SpanRewriter.rewrite_runs(texts, spans, "synthetic", synthetic=lambda label, text: "Ann Lee")
+    assert changed == {1: "Ann Lee", 2: ""}
+
+
+def test_rewrite_runs_handles_several_spans_in_one_run():
+    texts = ["a 1.2.3.4 b 5.6.7.8", " c"]
+    spans = [Span(2, 9, "1.2.3.4", "IPV4"), Span(12, 19, "5.6.7.8", "IPV4")]
+    assert SpanRewriter.rewrite_runs(texts, spans, "blur") == {0: "a ------- b -------"}
+    assert SpanRewriter.rewrite_runs(texts, [], "black") == {}
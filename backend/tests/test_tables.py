@@ -0,0 +1,43 @@
+import pandas as pd
+from app.model.CSVRedactor import redact_line
+from app.model.XelRedactor import FileRedactor, redact_columns
+
+
+def test_string_columns_match_line_redaction():
+    df = pd.DataFrame({
+        "host": ["10.0.0.1 up", "none", None],
+        "when": ["2024-01-02 at 10:11:12", "later", "2023-12-31"],
+    })
+    out = redact_columns(df, ["IPV4", "DATE", "TIME"], "black")
+    redactor = FileRedactor()
+    for name in df.columns:
+        for before, after in zip(df[name], out[name]):
+            if pd.isna(before):
+                assert pd.isna(after)
+            else:
+                assert after == redactor.redact_line(before, 50, "blackout")
+    assert out["host"][0] == "████████ up"
+
+
+def test_numeric_and_mixed_cells_are_kept():
+    df = pd.DataFrame({"n": [1, 2], "mixed": ["10.0.0.1", 7]})
+    out = redact_columns(df, ["IPV4"], "blur")
+    assert out["n"].tolist() == [1, 2]
+    assert out["mixed"].tolist() == ["--------", 7]
+    # The input chunk is not modified
+    assert df["mixed"][0] == "10.0.0.1"
+
+
+def test_always_and_never_redact_skip_detection():
+    df = pd.DataFrame({"secret": ["abc", 12], "ip": ["10.0.0.1", "10.0.0.2"], "other": ["10.0.0.3", "x"]})
+    out = redact_columns(df, ["IPV4"], "black", always_redact={"secret"}, never_redact={"ip"})
+    assert out["secret"].tolist() == ["███", "██"]
+    assert out["ip"].tolist() == ["10.0.0.1", "10.0.0.2"]
+    assert out["other"].tolist() == ["████████", "x"]
+
+
+def test_csv_pattern_set_dates():
+    df = pd.DataFrame({"d": ["born 3Mar85", "2024-01-02"]})
+    out = redact_columns(df, ["DATE"], "black", pattern_set="csv")
+    assert out["d"].tolist() == ["born ██████", "██████████"]
+    assert redact_line("born 3Mar85", 50, "blackout") == "born ██████"
@@ -0,0 +1,71 @@
+import io
+import os
+import time
+import pytest
+from fastapi import UploadFile
+from app import uploads
+from app.cache import ResultCache
+from app.retention import RetentionPolicy
+
+
+def test_save_hashes_while_copying(tmp_path):
+    data = os.urandom(3 * 1024 * 1024 + 17)
+    upload = UploadFile(io.BytesIO(data), filename="../../etc/report.pdf")
+    path, digest = uploads.save(upload, str(tmp_path))
+    assert path == str(tmp_path / "report.pdf")
+    assert digest == ResultCache.file_digest(path)
+    with open(path, "rb") as f:
+        assert f.read() == data
+
+
+def test_save_numbers_colliding_names(tmp_path):
+    first, _ = uploads.save(UploadFile(io.BytesIO(b"a"), filename="a.txt"), str(tmp_path))
+    second, _ = uploads.save(UploadFile(io.BytesIO(b"b"), filename="a.txt"), str(tmp_path))
+    assert (os.path.basename(first), os.path.basename(second)) == ("a.txt", "a_1.txt")
+
+
+def test_level_must_be_a_known_step():
+    assert uploads._check_level(75) == 75
+    with pytest.raises(ValueError):
+        uploads._check_level(60)
+
+
+def _entry(root, name, size, age):
+    path = root / name
+    path.mkdir()
+    (path / "data").write_bytes(b"x" * size)
+    then = time.time() - age
+    os.utime(path, (then, then))
+    return path
+
+
+def test_retention_drops_expired_entries(tmp_path):
+    old = _entry(tmp_path, "old", 10, age=7200)
+    fresh = _entry(tmp_path, "fresh", 10, age=10)
+    assert RetentionPolicy(ttl=3600, max_bytes=2**20).prune(str(tmp_path)) == 1
+    assert not old.exists() and fresh.exists()
+
+
+def test_retention_evicts_oldest_over_quota_outside_grace(tmp_path):
+    oldest = _entry(tmp_path, "a", 100, age=300)
+    older = _entry(tmp_path, "b", 100, age=200)
+    newest = _entry(tmp_path, "c", 100, age=1)
+    policy = RetentionPolicy(ttl=3600, max_bytes=150, grace=60)
+    assert policy.prune(str(tmp_path)) == 2
+    assert not oldest.exists() and not older.exists()
+    # Still over quota, but too young to be removed for size
+    assert newest.exists()
+
+
+def test_retention_ignores_missing_root(tmp_path):
+    assert RetentionPolicy().prune(str(tmp_path / "missing")) == 0
+
+
+def test_retention_prunes_plain_files_by_size(tmp_path):
+    for name, age in (("old.prof", 300), ("new.prof", 200)):
+        path = tmp_path / name
+        path.write_bytes(b"x" * 100)
+        then = time.time() - age
+        os.utime(path, (then, then))
+    assert RetentionPolicy(ttl=3600, max_bytes=150, grace=60).prune(str(tmp_path)) == 1
+    assert sorted(os.listdir(tmp_path)) == ["new.prof"]
@@ -9,6 +9,31 @@ document.addEventListener('DOMContentLoaded', () => {
 
     let currentStep = 0;
 
+    const API_BASE = 'http://127.0.0.1:8000';
+    const POLL_INTERVAL_MS = 1000;
+
+    // ⏱️ Poll job status, showing page/slide progress while it runs
+    async function waitForJob(id) {
+        while (true) {
+            const response = await fetch(`${API_BASE}/jobs/${id}`);
+            if (!response.ok) {
+                throw new Error(`Server responded with ${response.status}`);
+            }
+
+            const job = await response.json();
+            if (job.status === 'done') {
+                return job;
+            }
+            if (job.status === 'failed') {
+                throw new Error(job.error || 'Redaction failed');
+            }
+
+            const { done, total } = job.progress;
+            status.textContent = total ? `⏳ Processing… ${done}/${total}` : "⏳ Processing…";
+            await new Promise((resolve) => setTimeout(resolve, POLL_INTERVAL_MS));
+        }
+    }
+
     // 🔁 Toggle Light/Dark Mode
     toggleModeButton.addEventListener('click', () => {
         document.body.classList.toggle('light-mode');
@@ -61,11 +86,20 @@ document.addEventListener('DOMContentLoaded', () => {
         status.textContent = "⏳ Processing…";
 
         try {
-            const response = await fetch('http://127.0.0.1:8000/redact', { 
+            // 📨 Submit a job, then poll until the backend has finished
+            const submitResponse = await fetch(`${API_BASE}/jobs`, {
                 method: 'POST',
                 body: formData,
             });
 
+            if (!submitResponse.ok) {
+                throw new Error(`Server responded with ${submitResponse.status}`);
+            }
+
+            const { id } = await submitResponse.json();
+            await waitForJob(id);
+
+            const response = await fetch(`${API_BASE}/jobs/${id}/result`);
             if (!response.ok) {
                 throw new Error(`Server responded with ${response.status}`);
             }